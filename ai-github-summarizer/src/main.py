@@ -1,18 +1,17 @@
 import asyncio
+import hashlib
 import logging
 import os
 import signal
 import sys
-from typing import Any, Dict, Optional, cast
+from pathlib import Path
+from typing import Any, Awaitable, Dict, Optional, cast
 from urllib.parse import urlparse
 
-import pydantic_ai
 from daytona_sdk import CreateWorkspaceParams, Daytona, DaytonaConfig
 from daytona_sdk.workspace import Workspace
 from dotenv import load_dotenv
 from pydantic import BaseModel
-from pydantic_ai import Agent
-from pydantic_ai.models import KnownModelName
 
 # Set up logging
 logging.basicConfig(
@@ -70,17 +69,9 @@ def normalize_git_url(url: str) -> str:
     return url
 
 
-async def create_workspace(config: Dict[str, str]) -> Optional[Workspace]:
-    """Create a Daytona workspace using the SDK."""
+async def create_workspace(daytona: Daytona, config: Dict[str, str]) -> Optional[Workspace]:
+    """Create a Daytona workspace using the shared SDK client."""
     try:
-        daytona = Daytona(
-            config=DaytonaConfig(
-                api_key=config['api_key'],
-                server_url=config['server_url'],
-                target=config['target']
-            )
-        )
-
         workspace_params = CreateWorkspaceParams(
             language="python",
             target=config['target'],
@@ -103,7 +94,9 @@ async def clone_repository(workspace: Workspace, repo_url: str) -> bool:
         print(f"Cloning repository: {repo_url}")
         # Using the Git API instead of shell commands
         workspace_path = "/home/daytona/"
-        workspace.git.clone(
+        # Run in a worker thread so the event loop can still handle Ctrl+C during the clone
+        await asyncio.to_thread(
+            workspace.git.clone,
             url=repo_url,
             path=workspace_path
         )
@@ -123,11 +116,11 @@ async def get_repo_changes(workspace: Workspace) -> Dict[str, Any]:
     try:
         # First verify if the repo exists and has files
         logger.info(f"Verifying repository at {repo_dir}")
-        verify_cmd = workspace.process.exec(f"ls -la {repo_dir}")
+        verify_cmd = await asyncio.to_thread(workspace.process.exec, f"ls -la {repo_dir}")
         logger.info(f"Directory contents: {verify_cmd.result if verify_cmd.result else 'Empty'}")
 
         # Find the actual repo directory (might be in a subdirectory)
-        find_git_cmd = workspace.process.exec(f"find {repo_dir} -type d -name .git")
+        find_git_cmd = await asyncio.to_thread(workspace.process.exec, f"find {repo_dir} -type d -name .git")
         if find_git_cmd.result:
             git_dirs = find_git_cmd.result.strip().split('\n')
             if git_dirs:
@@ -137,15 +130,25 @@ async def get_repo_changes(workspace: Workspace) -> Dict[str, Any]:
 
         # Use shell echo to check current directory
         logger.info("Getting current working directory...")
-        pwd_cmd = workspace.process.exec(f"cd {repo_dir} && pwd")
+        pwd_cmd = await asyncio.to_thread(workspace.process.exec, f"cd {repo_dir} && pwd")
         if pwd_cmd.result:
             logger.info(f"Current directory: {pwd_cmd.result.strip()}")
 
+        # The git queries and the file listing don't depend on each other, so start them
+        # all at once in worker threads and await each one where its result is needed
+        def run(command: str) -> asyncio.Task:
+            return asyncio.create_task(asyncio.to_thread(workspace.process.exec, command))
+
+        # Use explicit --git-dir to ensure correct repo access
+        branches_task = run(f"git --git-dir={repo_dir}/.git branch -a")
+        commits_task = run(f"git --git-dir={repo_dir}/.git log -5 --date=short --pretty=format:'%h - %an, %ad : %s'")
+        commit_count_task = run(f"git --git-dir={repo_dir}/.git rev-list --count HEAD")
+        files_task = run(f"find {repo_dir} -type f -not -path '*/.git/*' -not -path '*/.daytona/*'")
+
         # Get branch information using Git command directly (more reliable than API)
         logger.info(f"Fetching branch information from {repo_dir}...")
         try:
-            # Use explicit --git-dir to ensure correct repo access
-            branches_cmd = workspace.process.exec(f"git --git-dir={repo_dir}/.git branch -a")
+            branches_cmd = await branches_task
             if branches_cmd.result:
                 # Extract branch names from command output
                 branch_lines = branches_cmd.result.strip().split('\n')
@@ -180,8 +183,7 @@ async def get_repo_changes(workspace: Workspace) -> Dict[str, Any]:
         # For commit history
         logger.info("Fetching recent commits...")
         try:
-            # Use git --git-dir explicitly
-            commit_response = workspace.process.exec(f"git --git-dir={repo_dir}/.git log -5 --pretty=format:'%h - %an, %ar : %s'")
+            commit_response = await commits_task
             results['recent_commits'] = commit_response.result.strip() if commit_response.result else "No commit history available"
             logger.info(f"Found {len(results['recent_commits'].split('\\n'))} commits")
         except Exception as e:
@@ -191,12 +193,13 @@ async def get_repo_changes(workspace: Workspace) -> Dict[str, Any]:
         # Try to get diff stats between commits - FIXED to handle repos with only one commit
         try:
             # First check if we have more than one commit
-            commit_count_cmd = workspace.process.exec(f"git --git-dir={repo_dir}/.git rev-list --count HEAD")
+            commit_count_cmd = await commit_count_task
             commit_count = int(commit_count_cmd.result.strip()) if commit_count_cmd.result else 0
 
             if commit_count > 1:
                 # We have multiple commits, can get diff between last two
-                diff_response = workspace.process.exec(f"git --git-dir={repo_dir}/.git diff HEAD~1 HEAD --stat")
+                diff_response = await asyncio.to_thread(
+                    workspace.process.exec, f"git --git-dir={repo_dir}/.git diff HEAD~1 HEAD --stat")
                 results['diff_stats'] = diff_response.result.strip() if diff_response.result else ""
             else:
                 # Repository has only one commit
@@ -209,9 +212,11 @@ async def get_repo_changes(workspace: Workspace) -> Dict[str, Any]:
         logger.info(f"Listing all files in {repo_dir}...")
         try:
             # Simplified command that doesn't use complex pipes or escaping
-            files_cmd = workspace.process.exec(f"find {repo_dir} -type f -not -path '*/.git/*' -not -path '*/.daytona/*'")
+            files_cmd = await files_task
             if files_cmd.result:
-                files = files_cmd.result.strip().split('\n')
+                # find's order depends on the filesystem; sorting keeps the summary prompt, and so its
+                # cache key, the same for an unchanged repository
+                files = sorted(files_cmd.result.strip().split('\n'))
                 results['all_files'] = files
                 logger.info(f"Found {len(files)} files")
                 if len(files) > 0:
@@ -264,22 +269,41 @@ async def cleanup_workspace(workspace: Optional[Workspace], daytona_client: Dayt
             print(f"Error removing workspace: {e}")
 
 
-def setup_signal_handlers(workspace: Optional[Workspace], daytona_client: Daytona) -> None:
-    """Set up signal handlers for graceful shutdown."""
-    def signal_handler(sig, frame):
-        print("\nReceived termination signal. Cleaning up resources...")
-        # Run cleanup in the main thread - we can't use asyncio here safely
-        if workspace:
-            try:
-                print(f"Removing workspace: {workspace.id}")
-                daytona_client.remove(workspace)
-                print("Workspace removed successfully")
-            except Exception as e:
-                print(f"Error removing workspace: {e}")
-        sys.exit(0)
+class ShutdownRequested(Exception):
+    """Raised when a termination signal interrupts one of main()'s steps."""
+
+
+async def unless_shutdown(step: Awaitable[Any], shutdown: asyncio.Event) -> Any:
+    """Await a step, abandoning it as soon as a termination signal sets shutdown."""
+    step_task = asyncio.ensure_future(step)
+    shutdown_task = asyncio.ensure_future(shutdown.wait())
+    await asyncio.wait({step_task, shutdown_task}, return_when=asyncio.FIRST_COMPLETED)
+    shutdown_task.cancel()
+    if not step_task.done():
+        step_task.cancel()
+        raise ShutdownRequested
+    return step_task.result()
+
+
+def setup_signal_handlers(shutdown: asyncio.Event) -> None:
+    """Set up signal handlers for graceful shutdown.
 
-    signal.signal(signal.SIGINT, signal_handler)  # Ctrl+C
-    signal.signal(signal.SIGTERM, signal_handler)  # Termination signal
+    The handlers only flag the shutdown; main() removes the workspace once it sees the flag,
+    so no network calls happen inside a signal handler.
+    """
+    loop = asyncio.get_running_loop()
+
+    def request_shutdown() -> None:
+        if not shutdown.is_set():
+            print("\nReceived termination signal. Cleaning up resources...")
+        shutdown.set()
+
+    for sig in (signal.SIGINT, signal.SIGTERM):  # Ctrl+C and termination signal
+        try:
+            loop.add_signal_handler(sig, request_shutdown)
+        except NotImplementedError:
+            # Windows event loops don't support add_signal_handler
+            signal.signal(sig, lambda signum, frame: loop.call_soon_threadsafe(request_shutdown))
 
 
 # Replace the PyDantic AI model with the correct approach
@@ -291,6 +315,35 @@ class RepositorySummary(BaseModel):
     architecture: str
     potential_improvements: str
 
+# Summaries are cached on disk, keyed by the model and the full prompt
+SUMMARY_CACHE_DIR = Path.home() / ".cache" / "ai-github-summarizer"
+
+
+def summary_cache_path(model_name: str, prompt: str) -> Path:
+    """Return the cache file for a model/prompt pair."""
+    digest = hashlib.blake2b(f"{model_name}\0{prompt}".encode("utf-8"), digest_size=16).hexdigest()
+    return SUMMARY_CACHE_DIR / f"{digest}.json"
+
+
+def load_cached_summary(cache_path: Path) -> Optional[RepositorySummary]:
+    """Load a previously generated summary, if one is cached."""
+    try:
+        return RepositorySummary.model_validate_json(cache_path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable summary cache {cache_path}: {e}")
+        return None
+
+
+def store_cached_summary(cache_path: Path, summary: RepositorySummary) -> None:
+    """Save a generated summary so identical requests can skip the model call."""
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(summary.model_dump_json(), encoding="utf-8")
+    except OSError as e:
+        logger.warning(f"Could not write summary cache {cache_path}: {e}")
+
 async def generate_repository_summary(workspace: Workspace, repo_info: Dict[str, Any]) -> Optional[RepositorySummary]:
     """Generate a summary of the repository using PydanticAI."""
     try:
@@ -309,7 +362,7 @@ async def generate_repository_summary(workspace: Workspace, repo_info: Dict[str,
             repo_dir = "/home/daytona"
 
             # Find the actual git repository
-            find_git_cmd = workspace.process.exec(f"find {repo_dir} -type d -name .git")
+            find_git_cmd = await asyncio.to_thread(workspace.process.exec, f"find {repo_dir} -type d -name .git")
             if find_git_cmd.result:
                 git_dirs = find_git_cmd.result.strip().split('\n')
                 if git_dirs:
@@ -317,8 +370,8 @@ async def generate_repository_summary(workspace: Workspace, repo_info: Dict[str,
                     logger.info(f"Found git repository at: {repo_dir}")
 
             # Use simplified command
-            file_cmd = workspace.process.exec(f"find {repo_dir} -type f -not -path '*/.git/*' -not -path '*/.daytona/*'")
-            file_list = file_cmd.result.strip().split('\n') if file_cmd.result else []
+            file_cmd = await asyncio.to_thread(workspace.process.exec, f"find {repo_dir} -type f -not -path '*/.git/*' -not -path '*/.daytona/*'")
+            file_list = sorted(file_cmd.result.strip().split('\n')) if file_cmd.result else []
 
         logger.info(f"Found {len(file_list)} files")
         if len(file_list) > 0:
@@ -328,8 +381,8 @@ async def generate_repository_summary(workspace: Workspace, repo_info: Dict[str,
         # Get directory structure
         repo_dir = "/home/daytona"
         # Use simplified command
-        dir_cmd = workspace.process.exec(f"find {repo_dir} -type d -not -path '*/.git/*' -not -path '*/.daytona/*'")
-        dir_structure = dir_cmd.result.strip().split('\n') if dir_cmd.result else []
+        dir_cmd = await asyncio.to_thread(workspace.process.exec, f"find {repo_dir} -type d -not -path '*/.git/*' -not -path '*/.daytona/*'")
+        dir_structure = sorted(dir_cmd.result.strip().split('\n')) if dir_cmd.result else []
         logger.info(f"Found {len(dir_structure)} directories")
 
         # Determine important files to analyze
@@ -342,21 +395,26 @@ async def generate_repository_summary(workspace: Workspace, repo_info: Dict[str,
                 readme_files.append(f)
                 logger.info(f"Found README: {f}")
 
-        # Common important file patterns for various repository types
-        important_patterns = [
+        # Common important files for various repository types. None of these need a regex:
+        # each is a file name suffix, or a directory anywhere in the lowercased path
+        important_suffixes = [
             # Documentation
-            r'contributing\.md$', r'docs/',
+            'contributing.md',
             # Configuration
-            r'package\.json$', r'setup\.py$', r'requirements\.txt$', r'gemfile$', r'\.csproj$',
-            r'pom\.xml$', r'build\.gradle$', r'go\.mod$', r'cargo\.toml$', r'makefile$', r'dockerfile$',
+            'package.json', 'setup.py', 'requirements.txt', 'gemfile', '.csproj',
+            'pom.xml', 'build.gradle', 'go.mod', 'cargo.toml', 'makefile', 'dockerfile',
             # Main entry points
-            r'main\.(py|js|ts|go|java|rb|cs|cpp|rs)$', r'index\.(js|ts|html)$', r'app\.(js|ts|py)$',
-            r'server\.(js|ts|py)$', r'program\.cs$',
-            # Common source files
-            r'src/', r'lib/', r'app/', r'source/'
+            tuple(f'main.{ext}' for ext in ('py', 'js', 'ts', 'go', 'java', 'rb', 'cs', 'cpp', 'rs')),
+            ('index.js', 'index.ts', 'index.html'), ('app.js', 'app.ts', 'app.py'),
+            ('server.js', 'server.ts', 'server.py'), 'program.cs'
         ]
+        important_dirs = [
+            # Documentation and common source directories
+            'docs/', 'src/', 'lib/', 'app/', 'source/'
+        ]
+        important_checks = ([(suffix, str.endswith) for suffix in important_suffixes] +
+                            [(directory, str.__contains__) for directory in important_dirs])
 
-        import re
         important_files = []
 
         # Add README files
@@ -365,37 +423,33 @@ async def generate_repository_summary(workspace: Workspace, repo_info: Dict[str,
         # If no README, try to find other key files
         if not readme_files:
             logger.info("No README found. Looking for other significant files...")
-            for pattern in important_patterns:
-                matches = []
-                for f in file_list:
-                    if re.search(pattern, f.lower()):
-                        matches.append(f)
+            # Lowercase each path once rather than once per pattern
+            lowered_files = [(f, f.lower()) for f in file_list]
+            for pattern, matches_path in important_checks:
+                matches = [f for f, lowered in lowered_files if matches_path(lowered, pattern)]
                 if matches:
                     logger.info(f"Found {len(matches)} matches for pattern {pattern}")
                 important_files.extend(matches[:3])  # Limit to 3 files per pattern
 
         # Ensure we don't have too many files (limit to 15 for token consideration)
-        important_files = list(set(important_files))[:15]
+        # Sorted rather than set order, which changes between runs with string hash randomization
+        important_files = sorted(set(important_files))[:15]
         logger.info(f"Selected {len(important_files)} important files for analysis")
 
         # Get content of key files - Better error handling
         file_contents = {}
         for file_path in important_files:
             try:
-                size_cmd = workspace.process.exec(f"wc -c '{file_path}' || echo '0'")
-                size = 0
-                try:
-                    size = int(size_cmd.result.strip().split()[0])
-                except (ValueError, IndexError):
-                    pass
-
-                if size > 0 and size < 10000:  # 10KB limit
-                    cat_response = workspace.process.exec(f"cat '{file_path}'")
-                    if cat_response.result:
-                        file_contents[file_path] = cat_response.result
-                        logger.info(f"Successfully read {len(cat_response.result)} bytes from {file_path}")
-                    else:
-                        logger.warning(f"No content returned from {file_path}")
+                # Check the size and read the file in one round trip (10KB limit)
+                cat_response = await asyncio.to_thread(
+                    workspace.process.exec,
+                    f"size=$(wc -c < '{file_path}') && [ \"$size\" -gt 0 ] && [ \"$size\" -lt 10000 ] && cat '{file_path}'"
+                )
+                if cat_response.result:
+                    file_contents[file_path] = cat_response.result
+                    logger.info(f"Successfully read {len(cat_response.result)} bytes from {file_path}")
+                else:
+                    logger.warning(f"No content returned from {file_path}")
             except Exception as e:
                 logger.error(f"Error reading {file_path}: {e}")
                 continue
@@ -458,10 +512,21 @@ async def generate_repository_summary(workspace: Workspace, repo_info: Dict[str,
         Remember this is source code for a software project - focus on technical details and avoid vague generalizations.
         """
 
+        # pydantic_ai is only needed here, so import it lazily to keep startup fast
+        from pydantic_ai import Agent
+        from pydantic_ai.models import KnownModelName
+
         # Get model name from environment or use default
         model_name = cast(KnownModelName, os.getenv('PYDANTIC_AI_MODEL', 'openai:gpt-4'))
         logger.info(f"Using PydanticAI with model: {model_name}")
 
+        # Reuse the summary from an earlier run with the same model and repository state
+        cache_path = summary_cache_path(model_name, prompt)
+        cached_summary = load_cached_summary(cache_path)
+        if cached_summary:
+            logger.info(f"Loaded cached summary from {cache_path}")
+            return cached_summary
+
         # Initialize PydanticAI agent
         agent = Agent(model_name, result_type=RepositorySummary, instrument=True)
 
@@ -475,6 +540,7 @@ async def generate_repository_summary(workspace: Workspace, repo_info: Dict[str,
         # Run the agent in a thread pool executor
         result = await loop.run_in_executor(None, lambda: agent.run_sync(prompt))
         logger.info(f"Successfully received result from PydanticAI")
+        store_cached_summary(cache_path, result.data)
 
         # Return the data from the result
         return result.data
@@ -512,92 +578,108 @@ async def main():
     )
 
     workspace = None
+    shutdown = asyncio.Event()
+    abandoned = False
     try:
         # Create workspace
-        workspace = await create_workspace(config)
+        workspace = await create_workspace(daytona_client, config)
         if not workspace:
             print("Failed to create workspace. Exiting.")
             return
 
         # Set up signal handlers for graceful cleanup
-        setup_signal_handlers(workspace, daytona_client)
+        setup_signal_handlers(shutdown)
 
+        # Each long step is raced against the shutdown event, so Ctrl+C gets to cleanup promptly
         # Clone repository
-        clone_success = await clone_repository(workspace, normalized_url)
+        clone_success = await unless_shutdown(clone_repository(workspace, normalized_url), shutdown)
+        if shutdown.is_set():
+            return
         if not clone_success:
             print("Failed to clone repository. Exiting.")
             # Don't clean up workspace on failure - we'll let the user decide
             return
 
         # Get repository changes
-        changes = await get_repo_changes(workspace)
+        changes = await unless_shutdown(get_repo_changes(workspace), shutdown)
+        if shutdown.is_set():
+            return
 
         # Add repository name to the changes dictionary
         changes['repo_name'] = normalized_url.split('/')[-1].replace('.git', '')
 
-        # Generate repository summary with PydanticAI if OpenAI API key is available
+        # Display results, collected first so they go to stdout in a single write
+        lines = ["\nRepository Analysis Results:", "==========================="]
+
+        current_branch = changes.get('current_branch')
+        if current_branch is not None:
+            lines.append(f"\nCurrent Branch: {current_branch}")
+
+        ahead_commits = changes.get('ahead_commits')
+        behind_commits = changes.get('behind_commits')
+        if ahead_commits is not None or behind_commits is not None:
+            lines.append("\nSync Status:")
+            if ahead_commits is not None:
+                lines.append(f"Commits ahead of remote: {ahead_commits}")
+            if behind_commits is not None:
+                lines.append(f"Commits behind remote: {behind_commits}")
+
+        for title, key in (("Branches", 'branches'), ("Recent Commits", 'recent_commits'),
+                           ("Diff Statistics", 'diff_stats'), ("Changed Files", 'changed_files')):
+            value = changes.get(key)
+            if value:
+                lines.append(f"\n{title}:")
+                lines.append(str(value))
+
+        print("\n".join(lines), flush=True)
+
+        # Generate the summary only after the git results are on screen, so the user
+        # has something to read while waiting on the model
         summary = None
-        if 'openai_api_key' in config:
+        if 'openai_api_key' in config and not shutdown.is_set():
             # Set the OpenAI API key for PydanticAI
             os.environ['OPENAI_API_KEY'] = config['openai_api_key']
-            summary = await generate_repository_summary(workspace, changes)
-
-        # Display results
-        print("\nRepository Analysis Results:")
-        print("===========================")
-
-        if 'current_branch' in changes:
-            print(f"\nCurrent Branch: {changes['current_branch']}")
-
-        if 'ahead_commits' in changes or 'behind_commits' in changes:
-            print("\nSync Status:")
-            if 'ahead_commits' in changes:
-                print(f"Commits ahead of remote: {changes['ahead_commits']}")
-            if 'behind_commits' in changes:
-                print(f"Commits behind remote: {changes['behind_commits']}")
-
-        if 'branches' in changes and changes['branches']:
-            print("\nBranches:")
-            print(changes['branches'])
-
-        if 'recent_commits' in changes and changes['recent_commits']:
-            print("\nRecent Commits:")
-            print(changes['recent_commits'])
-
-        if 'diff_stats' in changes and changes['diff_stats']:
-            print("\nDiff Statistics:")
-            print(changes['diff_stats'])
-
-        if 'changed_files' in changes and changes['changed_files']:
-            print("\nChanged Files:")
-            print(changes['changed_files'])
+            summary = await unless_shutdown(generate_repository_summary(workspace, changes), shutdown)
+        if shutdown.is_set():
+            return
 
         # Display the AI-generated summary
         if summary:
-            print("\nRepository Summary (AI-Generated):")
-            print("=================================")
-            print(f"\nOverview:\n{summary.overview}")
-            print(f"\nMain Components:\n{summary.main_components}")
-            print(f"\nTech Stack:\n{summary.tech_stack}")
-            print(f"\nArchitecture:\n{summary.architecture}")
-            print(f"\nPotential Improvements:\n{summary.potential_improvements}")
+            print("\n".join((
+                "\nRepository Summary (AI-Generated):",
+                "=================================",
+                f"\nOverview:\n{summary.overview}",
+                f"\nMain Components:\n{summary.main_components}",
+                f"\nTech Stack:\n{summary.tech_stack}",
+                f"\nArchitecture:\n{summary.architecture}",
+                f"\nPotential Improvements:\n{summary.potential_improvements}",
+            )))
 
         # Keep the workspace running until the user explicitly chooses to delete it
-        if workspace:
+        if workspace and not shutdown.is_set():
             print("\nWorkspace is still running. You can access it through the Daytona dashboard.")
             print(f"Workspace ID: {workspace.id}")
             print("Press Ctrl+C to terminate and clean up the workspace...")
 
-            # Keep the script running until user interrupts
-            while True:
-                await asyncio.sleep(1)
+            # Keep the script running until a termination signal sets the shutdown event
+            await shutdown.wait()
 
+    except ShutdownRequested:
+        abandoned = True
     except KeyboardInterrupt:
         print("\nProcess interrupted by user.")
-        # Workspace cleanup will be handled by signal handlers
     except Exception as e:
         print(f"An error occurred: {e}")
         # Don't automatically clean up on failure
+    finally:
+        # Only a termination signal removes the workspace
+        if shutdown.is_set():
+            await cleanup_workspace(workspace, daytona_client)
+        if abandoned:
+            # An interrupted step may still be blocked in a worker thread (a git command or
+            # the model call). Exit now rather than let asyncio.run wait for it.
+            sys.stdout.flush()
+            os._exit(0)
 
 
 if __name__ == "__main__":
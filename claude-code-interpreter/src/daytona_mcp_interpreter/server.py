@@ -4,16 +4,13 @@ import json
 import logging
 from logging.handlers import RotatingFileHandler
 import os
-from pathlib import Path
 import sys
-import uuid
 from typing import List, Optional, Any, Union
 
 from dotenv import load_dotenv
 from daytona_sdk import Daytona, DaytonaConfig, CreateWorkspaceParams
 from daytona_sdk.workspace import Workspace
 from daytona_sdk.process import ExecuteResponse
-from daytona_sdk.filesystem import FileSystem
 
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
@@ -27,10 +24,25 @@ LOG_FILE = '/tmp/daytona-interpreter.log'
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 
 
+class JsonFormatter(logging.Formatter):
+    """Formats each log record as a single JSON line for machine parsing"""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "name": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
 def setup_logging() -> logging.Logger:
     """Configure logging with file and console output"""
     logger = logging.getLogger("daytona-interpreter")
-    logger.setLevel(logging.DEBUG)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
 
     if not logger.hasHandlers():
         # File handler
@@ -40,7 +52,11 @@ def setup_logging() -> logging.Logger:
             backupCount=5,
             encoding='utf-8'
         )
-        file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        # JSON lines in the log file are opt-in, the console keeps the readable format
+        if os.getenv('MCP_DAYTONA_LOG_JSON', 'false').lower() == 'true':
+            file_handler.setFormatter(JsonFormatter())
+        else:
+            file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
 
         # Console handler
         console_handler = logging.StreamHandler(sys.stderr)
@@ -70,6 +86,8 @@ class Config:
         self.target = os.getenv('MCP_DAYTONA_TARGET', 'us')
         self.timeout = float(os.getenv('MCP_DAYTONA_TIMEOUT', '180.0'))
         self.verify_ssl = os.getenv('MCP_VERIFY_SSL', 'false').lower() == 'true'
+        self.log_level = os.getenv('MCP_DAYTONA_LOG_LEVEL', 'INFO').upper()
+        logging.getLogger("daytona-interpreter").setLevel(self.log_level)
 
         # Optional debug logging
         self._log_config()
@@ -78,10 +96,11 @@ class Config:
         """Logs the current configuration settings excluding sensitive information."""
         logger = logging.getLogger("daytona-interpreter")
         logger.debug("Configuration Loaded:")
-        logger.debug(f"  Server URL: {self.server_url}")
-        logger.debug(f"  Target: {self.target}")
-        logger.debug(f"  Timeout: {self.timeout}")
-        logger.debug(f"  Verify SSL: {self.verify_ssl}")
+        logger.debug("  Server URL: %s", self.server_url)
+        logger.debug("  Target: %s", self.target)
+        logger.debug("  Timeout: %s", self.timeout)
+        logger.debug("  Verify SSL: %s", self.verify_ssl)
+        logger.debug("  Log Level: %s", self.log_level)
 
 
 class DaytonaInterpreter:
@@ -125,7 +144,7 @@ class DaytonaInterpreter:
 
         async def handle_progress(params: dict[str, Any]) -> None:
             if 'progressToken' in params and 'progress' in params:
-                self.logger.debug(f"Progress update: {params}")
+                self.logger.debug("Progress update: %s", params)
 
         async def handle_initialized(params: dict[str, Any]) -> None:
             self.logger.debug("Received initialized notification")
@@ -134,12 +153,12 @@ class DaytonaInterpreter:
             self.logger.debug("Received roots list changed notification")
 
         async def handle_cancelled(params: dict[str, Any]) -> None:
-            self.logger.info(f"Received cancelled notification: {params}")
+            self.logger.info("Received cancelled notification: %s", params)
             await self.cleanup_workspace()
 
         async def handle_unknown_notification(method: str, params: dict[str, Any]) -> None:
             """Handle any unknown notifications gracefully."""
-            self.logger.warning(f"Received unknown notification method: {method} with params: {params}")
+            self.logger.warning("Received unknown notification method: %s with params: %s", method, params)
 
         # Register notification handlers
         self.server.notification_handlers.update({
@@ -208,7 +227,7 @@ class DaytonaInterpreter:
                     result = await self.execute_python_code(code)
                     return [TextContent(type="text", text=result)]
                 except Exception as e:
-                    self.logger.error(f"Error executing tool '{name}': {e}", exc_info=True)
+                    self.logger.error("Error executing tool '%s': %s", name, e, exc_info=True)
                     return [TextContent(type="text", text=f"Error executing tool: {e}")]
 
             elif name == "command_executor":
@@ -219,11 +238,11 @@ class DaytonaInterpreter:
                     result = await self.execute_command(command)
                     return [TextContent(type="text", text=result)]
                 except Exception as e:
-                    self.logger.error(f"Error executing tool '{name}': {e}", exc_info=True)
+                    self.logger.error("Error executing tool '%s': %s", name, e, exc_info=True)
                     return [TextContent(type="text", text=f"Error executing tool: {e}")]
 
             else:
-                self.logger.error(f"Unknown tool: {name}")
+                self.logger.error("Unknown tool: %s", name)
                 raise ValueError(f"Unknown tool: {name}")
 
     async def initialize_workspace(self) -> None:
@@ -241,10 +260,10 @@ class DaytonaInterpreter:
         )
             try:
                 self.workspace = self.daytona.create(workspace_params)
-                self.logger.info(f"Created Workspace ID: {self.workspace.id}")                
+                self.logger.info("Created Workspace ID: %s", self.workspace.id)                
                 # Create workspace with progress indicator
             except Exception as e:
-                self.logger.error(f"Failed to create workspace: {e}", exc_info=True)
+                self.logger.error("Failed to create workspace: %s", e, exc_info=True)
                 raise
         else:
             self.logger.info("Workspace already exists")
@@ -261,11 +280,11 @@ class DaytonaInterpreter:
         try:
             # Execute Python code using the SDK
             response: ExecuteResponse = self.workspace.process.code_run(code)
-            self.logger.debug(f"ExecuteResponse: {response}")
+            self.logger.debug("ExecuteResponse: %s", response)
 
             # Handle the response result
             result = str(response.result).strip() if response.result else ""
-            self.logger.info(f"Execution Output:\n{result}")
+            self.logger.info("Execution Output:\n%s", result)
 
             # Determine the exit code safely:
             exit_code = getattr(response, 'code', None)
@@ -278,7 +297,7 @@ class DaytonaInterpreter:
                 "exit_code": response.exit_code
             }, indent=2)
         except Exception as e:
-            self.logger.error(f"Error executing Python code: {e}", exc_info=True)
+            self.logger.error("Error executing Python code: %s", e, exc_info=True)
             return json.dumps({
                 "stdout": "",
                 "stderr": str(e),
@@ -303,15 +322,15 @@ class DaytonaInterpreter:
                 # For simple commands, just use shlex.quote on arguments if needed
                 command = command.strip()
 
-            self.logger.debug(f"Executing command: {command}")
+            self.logger.debug("Executing command: %s", command)
 
             # Execute shell command using the SDK
             response: ExecuteResponse = self.workspace.process.exec(command)
-            self.logger.debug(f"ExecuteResponse: {response}")
+            self.logger.debug("ExecuteResponse: %s", response)
 
             # Handle the response result
             result = str(response.result).strip() if response.result else ""
-            self.logger.info(f"Command Output:\n{result}")
+            self.logger.info("Command Output:\n%s", result)
 
             # Determine the exit code safely:
             exit_code = getattr(response, 'code', None)
@@ -325,7 +344,7 @@ class DaytonaInterpreter:
                 "exit_code": exit_code
             }, indent=2)
         except Exception as e:
-            self.logger.error(f"Error executing command: {e}", exc_info=True)
+            self.logger.error("Error executing command: %s", e, exc_info=True)
             return json.dumps({
                 "stdout": "",
                 "stderr": str(e),
@@ -339,10 +358,10 @@ class DaytonaInterpreter:
         if self.workspace:
             try:
                 self.daytona.remove(self.workspace)
-                self.logger.info(f"Removed Workspace ID: {self.workspace.id}")
+                self.logger.info("Removed Workspace ID: %s", self.workspace.id)
                 self.workspace = None
             except Exception as e:
-                self.logger.error(f"Failed to remove workspace: {e}", exc_info=True)
+                self.logger.error("Failed to remove workspace: %s", e, exc_info=True)
 
     async def cleanup(self) -> None:
         """
@@ -374,15 +393,15 @@ class DaytonaInterpreter:
                     if any(isinstance(exc, asyncio.CancelledError) for exc in e.exceptions):
                         self.logger.info("Server was cancelled")
                     else:
-                        self.logger.error(f"Unhandled exception in TaskGroup: {e}", exc_info=True)
+                        self.logger.error("Unhandled exception in TaskGroup: %s", e, exc_info=True)
                 except asyncio.CancelledError:
                     self.logger.info("Server task was cancelled")
                 except Exception as e:
-                    self.logger.error(f"Unhandled exception in MCP server: {e}", exc_info=True)
+                    self.logger.error("Unhandled exception in MCP server: %s", e, exc_info=True)
                 finally:
                     await self.cleanup()
         except Exception as e:
-            self.logger.error(f"Server error during run: {e}", exc_info=True)
+            self.logger.error("Server error during run: %s", e, exc_info=True)
             await self.cleanup()
             raise
 
@@ -394,13 +413,15 @@ async def main():
     3. Create and run interpreter instance
     4. Handle interrupts and cleanup
     """
+    # Load .env first so it can also set the logging options read by setup_logging
+    load_dotenv()
     logger = setup_logging()
     logger.info("Starting Daytona MCP interpreter")
 
     try:
         config = Config()
     except Exception as e:
-        logger.error(f"Configuration error: {e}")
+        logger.error("Configuration error: %s", e)
         sys.exit(1)
 
     interpreter = DaytonaInterpreter(logger, config)
@@ -411,7 +432,7 @@ async def main():
         logger.info("Received interrupt signal")
         await interpreter.cleanup()
     except Exception as e:
-        logger.error(f"Fatal error: {e}", exc_info=True)
+        logger.error("Fatal error: %s", e, exc_info=True)
         await interpreter.cleanup()
         sys.exit(1)
 
@@ -1,14 +1,16 @@
+import ast
 import asyncio
-import glob
 import inspect
 import os
 import signal
 import sys
 import threading
 import time
-from itertools import cycle
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import cycle, islice, product
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 from daytona_sdk import CreateWorkspaceParams, Daytona, DaytonaConfig
 from dotenv import load_dotenv
@@ -17,9 +19,11 @@ from openai import AsyncOpenAI
 # Active workspaces for cleanup
 active_workspaces = []
 
-# Update the signal handler to not clean up workspaces automatically
-def signal_handler(signum, frame):
-    """Handle Ctrl+C to display active workspaces and exit"""
+# Set when Ctrl+C arrives while work is running in worker threads
+cancel_requested = threading.Event()
+
+def report_active_workspaces():
+    """Tell the user which workspaces are left running after a cancel"""
     print("\n\n⚠️ Process cancelled by user")
     if active_workspaces:
         print("Active workspaces will continue running:")
@@ -28,6 +32,11 @@ def signal_handler(signum, frame):
         print("\nYou can clean them up manually later using:")
         print("- The Daytona web interface")
         print("- The Daytona CLI")
+
+# Update the signal handler to not clean up workspaces automatically
+def signal_handler(signum, frame):
+    """Handle Ctrl+C to display active workspaces and exit"""
+    report_active_workspaces()
     sys.exit(0)
 
 # Register signal handler
@@ -49,20 +58,21 @@ def cleanup_all_workspaces():
 # Register cleanup handler for normal exit
 atexit.register(cleanup_all_workspaces)
 
+# Set to stop the spinner; waiting on it lets the thread exit as soon as it's set
+spinner_stop = threading.Event()
+
 def show_spinner():
     """Show a spinner while processing"""
-    spinner = cycle(['⠋', '⠙', '⠹', '⠸', '⠼', '⠴', '⠦', '⠧', '⠇', '⠏'])
-    while not show_spinner.done:
-        sys.stdout.write(next(spinner))
+    for frame in cycle(['⠋', '⠙', '⠹', '⠸', '⠼', '⠴', '⠦', '⠧', '⠇', '⠏']):
+        sys.stdout.write(f'{frame}\b')
         sys.stdout.flush()
-        sys.stdout.write('\b')
-        time.sleep(0.1)
+        if spinner_stop.wait(0.1):
+            break
 
 class Config:
     """Server configuration class that loads environment variables for Daytona setup"""
     def __init__(self):
-        load_dotenv()
-
+        # The project .env is loaded once at import time, before Config is created
         self.api_key = os.getenv('DAYTONA_API_KEY')
         if not self.api_key:
             raise ValueError("DAYTONA_API_KEY is required")
@@ -109,6 +119,82 @@ except ValueError as e:
         print("Please create a .env file with OPENAI_API_KEY=your_key_here")
     exit(1)
 
+RUNNER_PATH = "/home/daytona/runner.py"
+INPUTS_PATH = "/home/daytona/inputs.txt"
+# Seconds a single test input may run before the runner gives up on it
+TEST_INPUT_TIMEOUT = 30
+
+# Static test runner uploaded once per workspace. It loads function.py a single time and
+# runs it against every test input read from stdin (one repr() per line), so each
+# execution only has to ship the serialized inputs instead of a freshly generated script.
+RUNNER_CODE = r'''import ast
+import re
+import signal
+import sys
+import time
+
+FUNCTION_PATH = "/home/daytona/function.py"
+TEST_INPUT_TIMEOUT = %d
+
+# Add workspace directory to path
+sys.path.insert(0, "/home/daytona")
+
+def load_function():
+    """Load the deployed function and return it"""
+    local_vars = {}
+    try:
+        with open(FUNCTION_PATH, "r") as f:
+            source = f.read()
+        exec(compile(source, FUNCTION_PATH, "exec"), local_vars)
+    except Exception as e:
+        print(f"ERROR: Failed to load function: {e}")
+        sys.exit(1)
+
+    # Identify function
+    match = re.search(r"^def\s+([a-zA-Z0-9_]+)\s*\(", source, re.MULTILINE)
+    if match and match.group(1) in local_vars:
+        return local_vars[match.group(1)]
+
+    for name, value in local_vars.items():
+        if callable(value) and name != "__builtins__":
+            print(f"INFO: Found callable function: {name}")
+            return value
+
+    print("ERROR: No callable function found in the file")
+    sys.exit(1)
+
+def on_timeout(signum, frame):
+    raise TimeoutError(f"Test input timed out after {TEST_INPUT_TIMEOUT}s")
+
+def run_test(func, test_input):
+    # Lines are flushed as they go, so results survive if the whole batch is killed
+    signal.alarm(TEST_INPUT_TIMEOUT)
+    try:
+        start_time = time.time()
+        result = func(*test_input if isinstance(test_input, tuple) else (test_input,))
+        execution_time = time.time() - start_time
+
+        # Return the result and execution time
+        print(f"RESULT: {result}|{execution_time}", flush=True)
+    except BaseException as e:
+        # sys.exit() or a timeout in one input must not take the rest of the batch with it
+        print(f"ERROR: {type(e).__name__}: {e}", flush=True)
+    finally:
+        signal.alarm(0)
+
+signal.signal(signal.SIGALRM, on_timeout)
+func = load_function()
+for line in sys.stdin:
+    if not line.strip():
+        continue
+    try:
+        test_input = ast.literal_eval(line)
+    except Exception as e:
+        print(f"ERROR: Invalid test input: {e}", flush=True)
+        continue
+    run_test(func, test_input)
+''' % TEST_INPUT_TIMEOUT
+
 def cleanup_workspace(workspace):
     """Clean up the workspace"""
     if workspace:
@@ -122,11 +208,11 @@ def write_local_file(filepath: str, content: str) -> bool:
     """Write content to a local file"""
     try:
         # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        path = Path(filepath)
+        path.parent.mkdir(parents=True, exist_ok=True)
 
-        # Write the file
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        # Write the file in one call
+        path.write_text(content, encoding='utf-8')
 
         print(f"✅ Local file created: {filepath}")
         return True
@@ -137,10 +223,13 @@ def write_local_file(filepath: str, content: str) -> bool:
 class WorkspaceManager:
     def __init__(self):
         self.client = daytona_client
-        self.temp_dir = os.path.join(os.path.dirname(__file__), 'temp')
-        os.makedirs(self.temp_dir, exist_ok=True)
 
     async def create_workspace(self, name: str, function_code: str):
+        """Create a new workspace and deploy the function code off the event loop."""
+        # The SDK calls block, so run them in a thread to let gathered creations overlap
+        return await asyncio.to_thread(self.provision_workspace, name, function_code)
+
+    def provision_workspace(self, name: str, function_code: str):
         """Create a new workspace and deploy the function code."""
         try:
             workspace_params = CreateWorkspaceParams(
@@ -151,57 +240,34 @@ class WorkspaceManager:
 
             print(f"\n📁 Creating workspace {name}...")
 
-            # Show spinner while creating workspace
-            show_spinner.done = False
-            spinner_thread = threading.Thread(target=show_spinner)
-            spinner_thread.start()
-
+            # The caller runs a single spinner over all the creations happening in parallel
             workspace = self.client.create(workspace_params)
             active_workspaces.append(workspace)
 
             # Wait for workspace to initialize
             time.sleep(5)
 
-            show_spinner.done = True
-            spinner_thread.join()
-
             print(f"✅ Workspace created successfully (ID: {workspace.id})")
 
             try:
-                # First write function locally
-                local_function_path = os.path.join(self.temp_dir, f"{name}_function.py")
-                if not write_local_file(local_function_path, function_code):
-                    raise Exception("Failed to create local function file")
-
-                # Read the content of the file
-                print(f"📝 Reading local file {local_function_path}...")
-                with open(local_function_path, 'rb') as f:  # Open in binary mode
-                    file_content = f.read()
+                # Upload the source straight from memory, no local temp file round trip
+                file_content = function_code.encode('utf-8')
 
                 # ONLY use /home/daytona directory
                 remote_path = "/home/daytona/function.py"
                 print(f"📤 Uploading function code to {name} at {remote_path}...")
 
-                # Try uploading to /home/daytona
-                try:
-                    workspace.fs.upload_file(remote_path, file_content)
-                    print(f"✅ File uploaded successfully to {remote_path} using fs API")
-                except Exception as upload_error:
-                    print(f"⚠️ File upload using fs API failed: {upload_error}")
-                    print("Falling back to process.exec method...")
-
-                    # Fall back to exec method
-                    file_content_str = file_content.decode('utf-8', errors='replace')
-
-                    # First create an empty file
-                    workspace.process.exec(f"touch {remote_path}")
-
-                    # Write content line by line
-                    for i, line in enumerate(file_content_str.splitlines()):
-                        escaped_line = line.replace('"', '\\"').replace('$', '\\$')
-                        result = workspace.process.exec(f'echo "{escaped_line}" >> {remote_path}')
-                        if result.exit_code != 0:
-                            print(f"⚠️ Failed to write line {i+1}: {result.result}")
+                # The function and the static test runner don't depend on each other,
+                # so upload both at once rather than paying two round trips in sequence
+                print(f"📤 Uploading test runner to {name} at {RUNNER_PATH}...")
+                with ThreadPoolExecutor(max_workers=2) as pool:
+                    uploads = [
+                        pool.submit(self.upload_file, workspace, remote_path, file_content),
+                        pool.submit(self.upload_file, workspace, RUNNER_PATH, RUNNER_CODE.encode('utf-8')),
+                    ]
+                    for upload in uploads:
+                        upload.result()
+                print(f"✅ Files uploaded to {remote_path} and {RUNNER_PATH}")
 
                 # Verify the file exists and has content
                 print("🔍 Verifying file upload...")
@@ -233,26 +299,14 @@ class WorkspaceManager:
 
                 # Find the Python path for execution
                 print("🔍 Finding Python interpreter...")
-                python_check = workspace.process.exec("/usr/bin/python3 --version")
-                if (python_check.exit_code == 0):
-                    python_path = "/usr/bin/python3"
+                # One shell lookup instead of probing candidate paths one exec at a time
+                python_check = workspace.process.exec("command -v python3 || command -v python")
+                if python_check.exit_code == 0 and python_check.result.strip():
+                    python_path = python_check.result.strip().splitlines()[0]
                     print(f"✅ Found Python at: {python_path}")
                 else:
-                    python_paths = ["/usr/bin/python", "/usr/local/bin/python3", "/usr/local/bin/python"]
-                    for path in python_paths:
-                        check = workspace.process.exec(f"{path} --version")
-                        if check.exit_code == 0:
-                            python_path = path
-                            print(f"✅ Found Python at: {path}")
-                            break
-                        else:
-                            simple_check = workspace.process.exec("which python3 || which python")
-                            if simple_check.exit_code == 0:
-                                python_path = simple_check.result.strip()
-                                print(f"✅ Found Python at: {python_path}")
-                            else:
-                                python_path = "python3"
-                                print(f"⚠️ Using default Python path: {python_path}")
+                    python_path = "python3"
+                    print(f"⚠️ Using default Python path: {python_path}")
 
                 # Test the Python file directly to make sure it's valid
                 test_run = workspace.process.exec(f"{python_path} -m py_compile {remote_path}")
@@ -261,6 +315,12 @@ class WorkspaceManager:
                 else:
                     print(f"⚠️ Warning: Function code may have syntax errors: {test_run.result}")
 
+                # The static test runner is uploaded once; executions only ship their inputs
+                result = workspace.process.exec(f"ls -la {RUNNER_PATH}")
+                if result.exit_code != 0:
+                    print(f"❌ Test runner verification failed: {result.result}")
+                    raise Exception("Failed to deploy test runner")
+
                 print(f"✅ Function code deployed successfully to {name}")
                 # Store the remote path and python path for later use
                 workspace.remote_path = remote_path
@@ -274,186 +334,96 @@ class WorkspaceManager:
         except Exception as e:
             print(f"❌ Workspace creation error for {name}: {e}")
             raise
-        finally:
-            # Stop spinner if it's still running
-            if 'spinner_thread' in locals() and spinner_thread.is_alive():
-                show_spinner.done = True
-                spinner_thread.join()
-
-    async def execute_function(self, workspace, test_input: Any) -> Tuple[bool, Any, float]:
-        """Execute function in the workspace and get results."""
+
+    def upload_file(self, workspace, remote_path: str, content: bytes) -> None:
+        """Upload content to the workspace, falling back to process.exec if the fs API fails."""
+        try:
+            workspace.fs.upload_file(remote_path, content)
+        except Exception as upload_error:
+            print(f"⚠️ File upload using fs API failed: {upload_error}")
+            # Fall back to process.exec
+            file_content_str = content.decode('utf-8', errors='replace')
+            result = workspace.process.exec(f"cat > {remote_path} << 'EOF'\n{file_content_str}\nEOF")
+            if result.exit_code != 0:
+                print(f"⚠️ Failed to create file using here-doc: {result.result}")
+                # Try line by line
+                workspace.process.exec(f"touch {remote_path}")
+                for line in file_content_str.splitlines():
+                    escaped_line = line.replace('"', '\\"').replace('$', '\\$')
+                    workspace.process.exec(f'echo "{escaped_line}" >> {remote_path}')
+
+    async def execute_function_batch(self, workspace, test_inputs: List[Any]) -> List[Tuple[bool, Any, float]]:
+        """Execute function in the workspace for all test inputs and get results.
+
+        The runner loads the function once and evaluates the inputs in order,
+        printing one RESULT: or ERROR: line per input.
+        """
         try:
             if not hasattr(workspace, 'remote_path') or not hasattr(workspace, 'python_path'):
                 print(f"❌ Missing remote_path or python_path for workspace {workspace.id}")
-                return False, "Workspace setup incomplete", 0.0
+                return [(False, "Workspace setup incomplete", 0.0)] * len(test_inputs)
 
-            # Get the remote path where the function file is stored
-            function_path = workspace.remote_path
             python_path = workspace.python_path
 
-            # First inspect function file to get the actual function name
-            result = workspace.process.exec(f"grep -E '^def\\s+[a-zA-Z0-9_]+\\(' {function_path}")
-
-            if result.exit_code == 0 and result.result.strip():
-                # Extract function name from the def line
-                import re
-                match = re.search(r'def\s+([a-zA-Z0-9_]+)\s*\(', result.result.strip())
-                if match:
-                    function_name = match.group(1)
-                    print(f"✅ Found function name: {function_name}")
-                else:
-                    print(f"⚠️ Could not extract function name, defaulting to 'func'")
-                    function_name = "func"
-            else:
-                print(f"⚠️ Could not find function definition, defaulting to 'func'")
-                function_name = "func"
-
-            # Create a modified test_code that ensures the function is properly wrapped
-            test_code = f"""
-import time
-import sys
-import inspect
-import json
+            # The runner is already deployed, so only the serialized inputs are uploaded
+            inputs = "".join(f"{test_input!r}\n" for test_input in test_inputs)
+            await asyncio.to_thread(self.upload_file, workspace, INPUTS_PATH, inputs.encode('utf-8'))
 
-# Add workspace directory to path
-sys.path.insert(0, "/home/daytona")
-
-# Function to execute the test
-def run_test():
-    # Load function dynamically
-    local_vars = {{}}
-    try:
-        with open("{function_path}", "r") as f:
-            exec(f.read(), local_vars)
-    except Exception as e:
-        print(f"ERROR: Failed to load function: {{e}}")
-        exit(1)
-
-    # Identify function
-    func = None
-    if "{function_name}" in local_vars:
-        func = local_vars["{function_name}"]
-    else:
-        for name, value in local_vars.items():
-            if callable(value) and name != "__builtins__":
-                func = value
-                print(f"INFO: Found callable function: {{name}}")
-                break
-        else:
-            print("ERROR: No callable function found in the file")
-            exit(1)
-
-    # Use the provided test input
-    test_input = {test_input}
-
-    try:
-        start_time = time.time()
-        result = func(*test_input if isinstance(test_input, tuple) else (test_input,))
-        execution_time = time.time() - start_time
-
-        # Return the result and execution time
-        print(f"RESULT: {{result}}|{{execution_time}}")
-        return True
-    except Exception as e:
-        print(f"ERROR: {{str(e)}}")
-        exit(1)
+            # Execute the tests
+            print(f"🧪 Running {len(test_inputs)} tests in workspace {workspace.id}...")
+            print(f"Using Python: {python_path}, Runner path: {RUNNER_PATH}")
 
-# Run the test
-run_test()
-"""
-            # Write test code locally first
-            local_test_path = os.path.join(self.temp_dir, f"{workspace.id}_test.py")
-            if not write_local_file(local_test_path, test_code):
-                raise Exception("Failed to create local test file")
-
-            # Upload to workspace
-            print(f"📝 Uploading test code to workspace {workspace.id}...")
-
-            # Read the content of the file
-            with open(local_test_path, 'rb') as f:
-                file_content = f.read()
-
-            # Set remote path to /home/daytona
-            remote_test_path = "/home/daytona/test_runner.py"
-
-            # Upload the file
-            try:
-                workspace.fs.upload_file(remote_test_path, file_content)
-                print(f"✅ Test file uploaded to {remote_test_path}")
-            except Exception as upload_error:
-                print(f"⚠️ File upload using fs API failed: {upload_error}")
-                # Fall back to process.exec
-                file_content_str = file_content.decode('utf-8', errors='replace')
-                result = workspace.process.exec(f"cat > {remote_test_path} << 'EOF'\n{file_content_str}\nEOF")
-                if result.exit_code != 0:
-                    print(f"⚠️ Failed to create test file using here-doc: {result.result}")
-                    # Try line by line
-                    workspace.process.exec(f"touch {remote_test_path}")
-                    for line in file_content_str.splitlines():
-                        escaped_line = line.replace('"', '\\"').replace('$', '\\$')
-                        workspace.process.exec(f'echo "{escaped_line}" >> {remote_test_path}')
-
-            # Verify file exists
-            result = workspace.process.exec(f"ls -la {remote_test_path}")
-            if result.exit_code != 0:
-                print(f"❌ Test file verification failed: {result.result}")
-                return False, "Failed to create test file", 0.0
-            else:
-                print(f"✅ Test file verified: {result.result.strip()}")
-
-            # Set executable permissions
-            workspace.process.exec(f"chmod +x {remote_test_path}")
+            # Run with full error capture. The outer timeout covers hangs the per-input alarm
+            # can't interrupt; the lines printed before it fired are still returned.
+            batch_timeout = TEST_INPUT_TIMEOUT * len(test_inputs) + 10
+            result = await asyncio.to_thread(
+                workspace.process.exec,
+                f"timeout -s KILL {batch_timeout} {python_path} {RUNNER_PATH} < {INPUTS_PATH} 2>&1"
+            )
+            output = result.result.strip()
 
-            # Execute the test
-            print(f"🧪 Running test in workspace {workspace.id}...")
-            print(f"Using Python: {python_path}, Test path: {remote_test_path}")
+            print(f"Test result (exit code {result.exit_code}): {output}")
 
-            # Run with full error capture
-            result = workspace.process.exec(f"{python_path} {remote_test_path} 2>&1")
+            results = []
+            result_lines = [line for line in output.split('\n')
+                            if line.startswith(("RESULT:", "ERROR:"))]
 
-            print(f"Test result (exit code {result.exit_code}): {result.result.strip()}")
+            for line in result_lines[:len(test_inputs)]:
+                if line.startswith("ERROR:"):
+                    print(f"❌ Test execution error: {line}")
+                    results.append((False, line, 0.0))
+                    continue
 
-            if "ERROR:" in result.result:
-                error_msg = result.result.strip()
-                print(f"❌ Test execution error: {error_msg}")
-                return False, error_msg, 0.0
-            elif result.exit_code == 0 and "RESULT:" in result.result:
                 # Extract result using the RESULT: prefix
-                result_line = next((line for line in result.result.strip().split('\n')
-                                   if line.startswith("RESULT:")), None)
-
-                if result_line:
-                    output_part = result_line[len("RESULT:"):].strip()
-                    if "|" in output_part:
-                        output, time_taken = output_part.split("|")
-                        return True, eval(output), float(time_taken)
+                output_part = line[len("RESULT:"):].strip()
+                try:
+                    value, time_taken = output_part.rsplit("|", 1)
+                    results.append((True, eval(value), float(time_taken)))
+                except Exception:
+                    print(f"❌ Could not parse test result: {line}")
+                    results.append((False, line, 0.0))
+
+            # The runner exits early if the function itself could not be loaded,
+            # and a batch that hit the outer timeout stops part way through
+            if len(results) < len(test_inputs):
+                if result.exit_code == 137:
+                    print(f"❌ Test batch timed out after {batch_timeout}s")
+                    missing = f"Batch timed out after {batch_timeout}s before this input ran"
+                else:
+                    print(f"❌ Test execution failed with unexpected output")
+                    missing = output
+                results.extend([(False, missing, 0.0)] * (len(test_inputs) - len(results)))
 
-                print("❌ Could not parse test result")
-                return False, result.result, 0.0
-            else:
-                print(f"❌ Test execution failed with unexpected output")
-                return False, result.result, 0.0
+            return results
 
         except Exception as e:
             print(f"❌ Test execution error in workspace {workspace.id}: {str(e)}")
-            return False, str(e), 0.0
-        finally:
-            # Clean up local test file
-            try:
-                os.remove(local_test_path)
-            except:
-                pass
+            return [(False, str(e), 0.0)] * len(test_inputs)
 
-    def cleanup(self):
-        """Cleanup temporary files"""
-        try:
-            import shutil
-            shutil.rmtree(self.temp_dir, ignore_errors=True)
-        except:
-            pass
+# Prompt templates for generate_variations, filled in with str.format
+VARIATIONS_SYSTEM_PROMPT = "You are a Python optimization expert. Generate complete, working function variations that maintain the exact same interface and behavior as the original. Return only the function definition and its docstring, nothing else - no explanations, no examples, no extra code."
 
-async def generate_variations(original_function: str, num_variations: int = 1) -> List[str]:
-    """Generate optimized variations of the original function.
+VARIATIONS_PROMPT = """Generate {num_variations} optimized variations of this Python function.
 
     - ONLY include the function code, NO main block, NO print statements outside the function
     - NO explanations or text outside the function code
@@ -464,10 +434,10 @@ async def generate_variations(original_function: str, num_variations: int = 1) -
     Separate each variation with a line of 3 hyphens: ---
 
     Original function:
-    {original_function}
-    """
+    {original_function}"""
 
-    prompt = f"""Generate {num_variations} optimized variations of this Python function.
+async def generate_variations(original_function: str, num_variations: int = 1) -> List[str]:
+    """Generate optimized variations of the original function.
 
     - ONLY include the function code, NO main block, NO print statements outside the function
     - NO explanations or text outside the function code
@@ -478,24 +448,28 @@ async def generate_variations(original_function: str, num_variations: int = 1) -
     Separate each variation with a line of 3 hyphens: ---
 
     Original function:
-    {original_function}"""
+    {original_function}
+    """
+
+    prompt = VARIATIONS_PROMPT.format(num_variations=num_variations,
+                                      original_function=original_function)
 
     try:
         print(f"⏳ Requesting {num_variations} variations from GPT-4...")
-        show_spinner.done = False
+        spinner_stop.clear()
         spinner_thread = threading.Thread(target=show_spinner)
         spinner_thread.start()
 
         response = await client.chat.completions.create(
             model="gpt-4",
             messages=[
-                {"role": "system", "content": "You are a Python optimization expert. Generate complete, working function variations that maintain the exact same interface and behavior as the original. Return only the function definition and its docstring, nothing else - no explanations, no examples, no extra code."},
+                {"role": "system", "content": VARIATIONS_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.7
         )
 
-        show_spinner.done = True
+        spinner_stop.set()
         spinner_thread.join()
 
         variations_text = response.choices[0].message.content
@@ -522,18 +496,45 @@ async def generate_variations(original_function: str, num_variations: int = 1) -
         print(f"✅ Generated {len(variations)} variations successfully")
         return variations
     except Exception as e:
-        show_spinner.done = True
+        spinner_stop.set()
         if 'spinner_thread' in locals() and spinner_thread.is_alive():
             spinner_thread.join()
         print(f"❌ Error generating variations: {e}")
         return []
 
+# Test values per type hint, matched in order against the lowercased annotation
+TYPE_TEST_VALUES = (
+    ('int', (0, 1, -1, 9999, -9999)),
+    ('float', (0.0, 1.0, -1.0, 3.14159, float('inf'), float('-inf'))),
+    ('str', ("", "a", "test", "long" * 100, " ", "!@#$%^&*()_+", "123abc")),
+    ('list', ([], [1], [1, 2, 3], list(range(100)))),
+    ('bool', (True, False)),
+    ('dict', ({}, {"key": "value"}, {1: "one", 2: "two"}, {i: i for i in range(10)})),
+    ('set', (set(), {1, 2, 3}, {i for i in range(10)})),
+)
+FALLBACK_TEST_VALUES = (None, 0, 1, 5)
+
+def annotation_name(annotation: Any) -> str:
+    """Return the lowercased name of a type annotation"""
+    # Plain classes such as int or str only need their name; generics and strings go through str()
+    if type(annotation) is type:
+        return annotation.__name__.lower()
+    return str(annotation).lower()
+
+def top_level_function_name(code: str) -> Optional[str]:
+    """Return the name of the first module-level function in code, if any."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    # Only the module body matters, so skip walking into function and class bodies
+    return next((node.name for node in tree.body
+                 if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))), None)
+
 def generate_test_cases(function_code: str) -> List[Any]:
     """Dynamically generate test cases based on function signature, including edge cases."""
     try:
-        import re
-        match = re.search(r'def\s+([a-zA-Z0-9_]+)\s*\(', function_code)
-        function_name = match.group(1) if match else None
+        function_name = top_level_function_name(function_code)
 
         namespace = {}
         exec(function_code, namespace)
@@ -560,22 +561,10 @@ def generate_test_cases(function_code: str) -> List[Any]:
             param_default = [] if param.default == inspect.Parameter.empty else [param.default]
 
             # **Improve test case variety** based on type hints
-            if 'int' in str(param_type).lower():
-                base_cases.append(param_default + [0, 1, -1, 9999, -9999])
-            elif 'float' in str(param_type).lower():
-                base_cases.append(param_default + [0.0, 1.0, -1.0, 3.14159, float('inf'), float('-inf')])
-            elif 'str' in str(param_type).lower():
-                base_cases.append(param_default + ["", "a", "test", "long" * 100, " ", "!@#$%^&*()_+", "123abc"])
-            elif 'list' in str(param_type).lower():
-                base_cases.append(param_default + [[], [1], [1, 2, 3], list(range(100))])
-            elif 'bool' in str(param_type).lower():
-                base_cases.append(param_default + [True, False])
-            elif 'dict' in str(param_type).lower():
-                base_cases.append(param_default + [{}, {"key": "value"}, {1: "one", 2: "two"}, {i: i for i in range(10)}])
-            elif 'set' in str(param_type).lower():
-                base_cases.append(param_default + [set(), {1, 2, 3}, {i for i in range(10)}])
-            else:
-                base_cases.append(param_default + [None, 0, 1, 5])  # Fallback
+            type_name = annotation_name(param_type)
+            values = next((values for hint, values in TYPE_TEST_VALUES if hint in type_name),
+                          FALLBACK_TEST_VALUES)
+            base_cases.append(param_default + list(values))
 
         # **Generate unique combinations of test cases**
         test_cases = []
@@ -583,9 +572,8 @@ def generate_test_cases(function_code: str) -> List[Any]:
             for value in base_cases[0][:6]:  # Test up to 6 diverse cases
                 test_cases.append((value,))
         else:
-            from itertools import product
-            for combo in list(product(*[cases[:3] for cases in base_cases]))[:8]:  # Generate more diverse test cases
-                test_cases.append(combo)
+            # Take the first 8 combinations lazily instead of materialising the full product
+            test_cases.extend(islice(product(*[cases[:3] for cases in base_cases]), 8))
 
         print(f"✅ Generated {len(test_cases)} diverse test cases for '{function_name}'")
         return test_cases
@@ -594,6 +582,19 @@ def generate_test_cases(function_code: str) -> List[Any]:
         print(f"❌ Error generating test cases: {str(e)}")
         return [(0,), (1,), (5,)]  # Minimal fallback cases
 
+def outputs_match(result: Any, expected: Any) -> bool:
+    """Compare outputs based on their types, without hardcoding function specifics."""
+    # Containers of the same kind must match exactly
+    for container in (list, dict, set):
+        if isinstance(result, container) and isinstance(expected, container):
+            return result == expected
+    if isinstance(result, (int, float)) and isinstance(expected, (int, float)):
+        return abs(result - expected) < 1e-9
+    if isinstance(result, str) and isinstance(expected, str):
+        # Edge case: Ignore case for case-insensitive functions
+        return result.strip().lower() == expected.strip().lower()
+    return str(result) == str(expected)  # Default string comparison
+
 async def evaluate_variations(variations: List[str], original_function: str) -> List[Dict]:
     """Evaluate all variations using parallel Daytona workspaces."""
     print("\n🧪 Testing all versions...")
@@ -603,15 +604,6 @@ async def evaluate_variations(variations: List[str], original_function: str) ->
     workspace_manager = WorkspaceManager()
     all_versions = [original_function] + variations
 
-    # Generate test inputs first with expected outputs
-    print("⏳ Preparing validation test cases...")
-    validation_cases = await validate_functions(original_function, variations)
-    if not validation_cases:
-        print("❌ Failed to generate validation cases")
-        return []
-
-    print(f"✅ Created {len(validation_cases)} validated test cases")
-
     # Create all workspaces in parallel
     print("\n⚙️ Creating workspaces...")
     create_tasks = []
@@ -622,12 +614,28 @@ async def evaluate_variations(variations: List[str], original_function: str) ->
         workspace_names.append(version_name)
         create_tasks.append(workspace_manager.create_workspace(version_name, version))
 
+    # One spinner covers all the creations, since they share the spinner's stop event
+    spinner_stop.clear()
+    spinner_thread = threading.Thread(target=show_spinner)
+    spinner_thread.start()
     try:
         workspaces = await asyncio.gather(*create_tasks)
-        print(f"✅ Created {len(workspaces)} workspaces successfully")
     except Exception as e:
         print(f"❌ Error creating workspaces: {e}")
         return []
+    finally:
+        spinner_stop.set()
+        spinner_thread.join()
+    print(f"✅ Created {len(workspaces)} workspaces successfully")
+
+    # Generate test inputs with expected outputs, reusing the original function's workspace
+    print("⏳ Preparing validation test cases...")
+    validation_cases = await validate_functions(workspace_manager, workspaces[0], original_function)
+    if not validation_cases:
+        print("❌ Failed to generate validation cases")
+        return []
+
+    print(f"✅ Created {len(validation_cases)} validated test cases")
 
     # Run tests in parallel for all versions
     async def test_version(workspace, version, version_name, validation_cases):
@@ -642,10 +650,14 @@ async def evaluate_variations(variations: List[str], original_function: str) ->
 
         print(f"\n📝 Testing {version_name} (ID: {workspace.id})")
 
-        for j, (test_input, expected_output) in enumerate(validation_cases, 1):
-            success, result, exec_time = await workspace_manager.execute_function(
-                workspace, test_input
-            )
+        # Run every validation input through the workspace runner in one go
+        executions = await workspace_manager.execute_function_batch(
+            workspace, [test_input for test_input, _ in validation_cases]
+        )
+
+        for j, ((test_input, expected_output), (success, result, exec_time)) in enumerate(
+            zip(validation_cases, executions), 1
+        ):
 
             # Compare outputs based on their types, without hardcoding function specifics
             output_valid = False
@@ -656,21 +668,7 @@ async def evaluate_variations(variations: List[str], original_function: str) ->
                     print(f"\n⚠️ Variation {version_name} succeeded on input {test_input} where original function failed")
             elif success:
                 try:
-                    if isinstance(result, list) and isinstance(expected_output, list):
-                        # Lists should match exactly unless they are supposed to be sorted outputs
-                        output_valid = result == expected_output
-                    elif isinstance(result, dict) and isinstance(expected_output, dict):
-                        output_valid = result == expected_output
-                    elif isinstance(result, set) and isinstance(expected_output, set):
-                        output_valid = result == expected_output
-                    elif isinstance(result, (int, float)) and isinstance(expected_output, (int, float)):
-                        epsilon = 1e-9
-                        output_valid = abs(result - expected_output) < epsilon
-                    elif isinstance(result, str) and isinstance(expected_output, str):
-                        # Edge case: Ignore case for case-insensitive functions
-                        output_valid = result.strip().lower() == expected_output.strip().lower()
-                    else:
-                        output_valid = str(result) == str(expected_output)  # Default string comparison
+                    output_valid = outputs_match(result, expected_output)
 
                     if not output_valid:
                         print(f"\n⚠️ Mismatch for {version_name} on input {test_input}:")
@@ -717,7 +715,8 @@ async def evaluate_variations(variations: List[str], original_function: str) ->
         print(traceback.format_exc())
         return []
 
-async def validate_functions(original_function: str, variations: List[str]) -> List[Tuple]:
+async def validate_functions(workspace_manager: WorkspaceManager, original_workspace,
+                             original_function: str) -> List[Tuple]:
     """
     Generate validation cases from the original function and get reference outputs.
     This ensures all variations produce the same output as the original.
@@ -725,25 +724,17 @@ async def validate_functions(original_function: str, variations: List[str]) -> L
     print("\n🔍 Generating reference outputs from original function...")
 
     # Extract function name for informational purposes
-    import re
-    match = re.search(r'def\s+([a-zA-Z0-9_]+)\s*\(', original_function)
-    function_name = match.group(1) if match else "function"
+    function_name = top_level_function_name(original_function) or "function"
     print(f"🔍 Analyzing function: {function_name}")
 
-    # Create a temporary workspace for the original function
-    workspace_manager = WorkspaceManager()
-    original_workspace = await workspace_manager.create_workspace("Validator", original_function)
-
     # Generate test cases
     test_cases = generate_test_cases(original_function)
     print(f"✅ Created {len(test_cases)} test cases")
 
     # Get reference outputs from original function
     reference_results = []
-    for test_input in test_cases:
-        success, result, _ = await workspace_manager.execute_function(
-            original_workspace, test_input
-        )
+    executions = await workspace_manager.execute_function_batch(original_workspace, test_cases)
+    for test_input, (success, result, _) in zip(test_cases, executions):
         if success:
             # Store the input and expected output pair
             reference_results.append((test_input, result))
@@ -755,16 +746,6 @@ async def validate_functions(original_function: str, variations: List[str]) -> L
 
     print(f"\n✅ Generated {len(reference_results)} reference outputs from original function")
 
-    # Clean up validation workspace
-    try:
-        cleanup_workspace(original_workspace)
-        # Remove from active_workspaces to prevent double cleanup attempts
-        if original_workspace in active_workspaces:
-            active_workspaces.remove(original_workspace)
-        print("✅ Validator workspace cleaned up")
-    except Exception as e:
-        print(f"⚠️ Could not clean up validator workspace: {e}")
-
     return reference_results
 
 def format_results(results: List[Dict]) -> str:
@@ -807,28 +788,22 @@ def format_results(results: List[Dict]) -> str:
 
     return output
 
-def load_sample_functions() -> Dict[str, str]:
-    """Load sample functions from the samples directory"""
-    samples = {}
-    samples_dir = os.path.join(os.path.dirname(__file__), '..', 'samples')
-
-    if not os.path.exists(samples_dir):
-        os.makedirs(samples_dir)
-        # Add a default sample if directory is empty
-        default_sample = """def func(x):
+# Written to samples/sample1.py when the samples directory doesn't exist yet
+DEFAULT_SAMPLE = """def func(x):
     \"\"\"Calculate the square of a number\"\"\"
     return x * x
 """
-        with open(os.path.join(samples_dir, 'sample1.py'), 'w') as f:
-            f.write(default_sample)
 
-    for file in glob.glob(os.path.join(samples_dir, '*.py')):
-        with open(file, 'r') as f:
-            content = f.read()
-            name = os.path.basename(file)
-            samples[name] = content
+def load_sample_functions() -> Dict[str, str]:
+    """Load sample functions from the samples directory"""
+    samples_dir = Path(__file__).parent.parent / 'samples'
+
+    if not samples_dir.exists():
+        samples_dir.mkdir(parents=True)
+        # Add a default sample if directory is empty
+        (samples_dir / 'sample1.py').write_text(DEFAULT_SAMPLE, encoding='utf-8')
 
-    return samples
+    return {file.name: file.read_text(encoding='utf-8') for file in samples_dir.glob('*.py')}
 
 # Add this as a separate function
 def select_best_version(results: List[Dict]) -> Dict:
@@ -843,13 +818,39 @@ def select_best_version(results: List[Dict]) -> Dict:
         # If no version passes all tests, select the one with most successes
         return max(results, key=lambda x: (x['successes'], -x['total_time']))
 
+@contextmanager
+def sigint_cancels_current_task():
+    """While worker threads run, have Ctrl+C only flag the cancel and cancel the current task.
+
+    Exiting from the plain handler would make asyncio.run wait for those threads to finish.
+    """
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+
+    def request_cancel():
+        cancel_requested.set()
+        task.cancel()
+
+    try:
+        loop.add_signal_handler(signal.SIGINT, request_cancel)
+    except NotImplementedError:
+        # Windows event loops don't support add_signal_handler, so keep the plain handler
+        yield
+        return
+    try:
+        yield
+    finally:
+        # Back to the plain handler, so Ctrl+C still interrupts the blocking input() prompts
+        loop.remove_signal_handler(signal.SIGINT)
+        signal.signal(signal.SIGINT, signal_handler)
+
 async def main():
     try:
         print("\n🚀 Starting Function Optimizer")
         print("═" * 50)
         print("ℹ️  Press Ctrl+C to stop and cleanup workspaces")
 
-        samples = load_sample_functions()
+        samples = await asyncio.to_thread(load_sample_functions)
         if not samples:
             print("❌ No sample functions found!")
             return
@@ -891,27 +892,27 @@ async def main():
             except ValueError:
                 print("❌ Please enter a valid number.")
 
-        # Generate variations using OpenAI
-        variations = await generate_variations(original_function, num_variations)
-        if not variations:
-            print("❌ Failed to generate variations")
-            return
+        with sigint_cancels_current_task():
+            # Generate variations using OpenAI
+            variations = await generate_variations(original_function, num_variations)
+            if not variations:
+                print("❌ Failed to generate variations")
+                return
 
-        print(f"\n✅ Generated {len(variations)} variations")
+            print(f"\n✅ Generated {len(variations)} variations")
 
-        # Save the variations to local files
-        variations_dir = os.path.join(os.path.dirname(__file__), 'variations')
-        os.makedirs(variations_dir, exist_ok=True)
+            # Save the variations to local files
+            variations_dir = os.path.join(os.path.dirname(__file__), 'variations')
+            os.makedirs(variations_dir, exist_ok=True)
 
-        print("\n💾 Saving generated variations:")
-        for i, variation in enumerate(variations, 1):
-            variation_path = os.path.join(variations_dir, f"variation_{i}.py")
-            with open(variation_path, 'w', encoding='utf-8') as f:
-                f.write(variation)
-            print(f"✅ Saved variation {i} to {variation_path}")
+            print("\n💾 Saving generated variations:")
+            await asyncio.gather(*(
+                asyncio.to_thread(write_local_file, os.path.join(variations_dir, f"variation_{i}.py"), variation)
+                for i, variation in enumerate(variations, 1)
+            ))
 
-        # Evaluate all versions
-        results = await evaluate_variations(variations, original_function)
+            # Evaluate all versions
+            results = await evaluate_variations(variations, original_function)
         if not results:
             print("❌ No results to display")
             return
@@ -962,6 +963,15 @@ async def main():
             for workspace in active_workspaces:
                 print(f"- Workspace ID: {workspace.id}")
 
+    except asyncio.CancelledError:
+        if not cancel_requested.is_set():
+            raise
+        report_active_workspaces()
+        print("Workspaces that were still being created are not listed; check the Daytona dashboard for them.")
+        # Worker threads may still be creating workspaces or running code. Exit now rather than
+        # let asyncio.run wait for them.
+        sys.stdout.flush()
+        os._exit(0)
     except KeyboardInterrupt:
         print("\n\n⚠️ Process cancelled by user.")
     except Exception as e:
@@ -6,13 +6,16 @@ class TreeNode:
         self.right = None
 
     def insert(self, value):
-        if value < self.value:
-            if self.left is None:
-                self.left = TreeNode(value)
+        # Walk down iteratively so skewed trees don't hit the recursion limit
+        node = self
+        while True:
+            if value < node.value:
+                if node.left is None:
+                    node.left = TreeNode(value)
+                    return
+                node = node.left
             else:
-                self.left.insert(value)
-        else:
-            if self.right is None:
-                self.right = TreeNode(value)
-            else:
-                self.right.insert(value)
+                if node.right is None:
+                    node.right = TreeNode(value)
+                    return
+                node = node.right
@@ -1,5 +1,7 @@
 import os
 import re
+import argparse
+import hashlib
 import logging
 from pathlib import Path
 from dotenv import load_dotenv
@@ -10,30 +12,69 @@ from daytona_sdk.process import ExecuteResponse
 import ast
 import signal
 import sys
+from functools import cached_property, lru_cache
 from itertools import cycle
 import threading
-import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+# Separator line used between the sections of console output
+SEP = "═" * 50
+
+# Hugging Face model used to generate the tests. Change model here
+MODEL_ID = "meta-llama/Llama-3.3-70B-Instruct"
+
+# Patterns used to pull the generated test code out of the model's response
+CODE_BLOCK_RE = re.compile(r'```(?:py|python)?\n(.*?)\n```', re.DOTALL)
+ANY_CODE_BLOCK_RE = re.compile(r'```.*?```', re.DOTALL)
+# Fences, <end_code> markers and standalone 'python' lines
+ARTIFACT_RE = re.compile(r'```(?:python|py)?|<end_code>|^python\s*$', re.MULTILINE)
+# Splits the combined model response into its summary and test sections
+RESPONSE_SECTIONS_RE = re.compile(r'<<<SUMMARY>>>(.*?)<<<TESTS>>>(.*)', re.DOTALL)
+# Standalone 'py' tokens, leaving words like 'pytest' alone
+STANDALONE_PY_RE = re.compile(r'(?<!test)\bpy\b(?!test)')
+# Pieces of unittest's verbose output: per-test result lines, the run summary and the final OK line
+UNITTEST_LINE_RE = re.compile(r'^(\S+)[^\n]*?\.\.\.[ \t]*(\S*)', re.MULTILINE)
+UNITTEST_SUMMARY_RE = re.compile(r'^Ran \d+ tests? in (\S+)', re.MULTILINE)
+UNITTEST_OK_RE = re.compile(r'^OK\b', re.MULTILINE)
+# Names of class headers (up to their colon), for the text-matching fallback when code doesn't parse
+CLASS_NAME_RE = re.compile(r'^\s*class\s+(\w+)[^:\n]*:', re.MULTILINE)
+
+# One pool runs all background work: the spinner, the model calls and workspace creation.
+# The model calls only wait on the network, so it has room for several at once.
+POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix='code-tester')
+
+# Set once the user cancels, so the process exits without waiting on running model calls
+cancel_requested = threading.Event()
 
 def signal_handler(signum, frame):
     print("\n\n⚠️ Process cancelled by user. Cleaning up...")
+    # Only set the flag and unwind here: the pool is shut down on the way out, since
+    # POOL.shutdown takes a lock that an interrupted POOL.submit may be holding
+    cancel_requested.set()
     sys.exit(0)
 
 # Register the signal handler
 signal.signal(signal.SIGINT, signal_handler)
 
+# Set to stop the spinner; waiting on it lets the thread exit as soon as it's set
+spinner_stop = threading.Event()
+
+# Each frame is pre-encoded with its trailing backspace so a tick is a single write
+SPINNER_FRAMES = [f'{frame}\b'.encode('utf-8') for frame in '⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏']
+
 def show_spinner():
-    spinner = cycle(['⠋', '⠙', '⠹', '⠸', '⠼', '⠴', '⠦', '⠧', '⠇', '⠏'])
-    while not show_spinner.done:
-        sys.stdout.write(next(spinner))
-        sys.stdout.flush()
-        sys.stdout.write('\b')
-        time.sleep(0.1)
+    sys.stdout.flush()  # Push out any pending text before writing to the buffer below it
+    out = sys.stdout.buffer
+    for frame in cycle(SPINNER_FRAMES):
+        out.write(frame)
+        out.flush()
+        if spinner_stop.wait(0.1):
+            break
 
 class Config:
     """Server configuration class that loads environment variables for  Daytona setup"""
     def __init__(self):
-        load_dotenv()
-
         self.api_key = os.getenv('DAYTONA_API_KEY')
         if not self.api_key:
             raise ValueError("DAYTONA_API_KEY is required but not found in environment variables")
@@ -44,79 +85,115 @@ class Config:
         self.target = os.getenv('DAYTONA_TARGET', 'us')  # Ensure it's one of ['eu', 'us', 'asia']
         self.timeout = float(os.getenv('DAYTONA_TIMEOUT', '180.0'))
         self.verify_ssl = os.getenv('VERIFY_SSL', 'false').lower() == 'true'
+        self.hf_token = os.getenv('HUGGINGFACE_TOKEN')
 
-    def get_daytona_config(self):
+    @cached_property
+    def daytona_config(self):
+        # Built on first use, then shared
         return DaytonaConfig(
             api_key=self.api_key,
             server_url=self.server_url,
             target=self.target
         )
 
+# Load .env once at import time; Config and main() both read from os.environ
+load_dotenv()
+
 # Initialize Config
 config = Config()
-daytona_client = Daytona(config=config.get_daytona_config())
+
+@lru_cache(maxsize=1)
+def get_daytona_client():
+    """Create the Daytona client on first use and share it for the rest of the run"""
+    return Daytona(config=config.daytona_config)
 
 def get_python_files(samples_dir):
     """Get all Python files from the samples directory"""
     return list(Path(samples_dir).glob('*.py'))
 
-def select_file(python_files):
-    """Prompt user to select a single file for analysis"""
+def select_files(python_files):
+    """Prompt user to select one or more files for analysis"""
     print("\nAvailable Python files in samples directory:")
     for i, file in enumerate(python_files, 1):
         print(f"{i}. {file.name}")
 
     while True:
+        choice = input("\nEnter the numbers of the files to analyze, separated by commas, or 'all': ").strip()
+        if choice.lower() == 'all':
+            return list(python_files)
         try:
-            file_num = int(input("\nEnter the number of the file to analyze: "))
-            if 0 < file_num <= len(python_files):
-                return python_files[file_num-1]
-            else:
-                print("Invalid file number. Try again.")
+            file_nums = [int(part) for part in choice.split(',') if part.strip()]
         except ValueError:
-            print("Please enter a valid number.")
+            print("Please enter valid numbers.")
+            continue
+        if file_nums and all(0 < file_num <= len(python_files) for file_num in file_nums):
+            # Keep the order given, dropping repeats
+            return [python_files[file_num-1] for file_num in dict.fromkeys(file_nums)]
+        print("Invalid file number. Try again.")
+
+def parse_args():
+    """Parse the command-line options that let the file picker be skipped"""
+    parser = argparse.ArgumentParser(description="Generate and run unit tests for sample Python files in Daytona.")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--file', action='append', help="Sample file to test, by path or by name in the samples directory (repeatable)")
+    group.add_argument('--all', action='store_true', help="Test every Python file in the samples directory")
+    return parser.parse_args()
+
+def resolve_files(names, samples_dir):
+    """Resolve file arguments to paths, looking in the samples directory for bare names"""
+    files = []
+    for name in names:
+        path = Path(name)
+        if not path.is_file():
+            path = samples_dir / name
+        if not path.is_file():
+            raise ValueError(f"File not found: {name}")
+        files.append(path)
+    return files
 
 def cleanup_workspace(workspace):
     """Clean up the workspace"""
     if workspace:
         try:
-            daytona_client.remove(workspace)
+            get_daytona_client().remove(workspace)
             logging.info(f"Workspace {workspace.id} removed successfully.")
         except Exception as e:
             logging.error(f"Failed to remove workspace: {e}", exc_info=True)
 
-def format_model_response(response: str) -> str:
+@contextmanager
+def daytona_workspace(workspace_params):
     """
-    Format the model's response to match expected pattern if it doesn't already.
+    Start creating a workspace on the shared pool and yield its future.
+    The workspace is removed exactly once, however the block exits.
     """
-    if not re.search(r'```(?:py|python)?\n(.*?)\n```', response, re.DOTALL):
-        # If response doesn't match expected pattern, format it properly
-        cleaned = response.strip()
-        # Remove any existing code block markers that might be malformed
-        cleaned = re.sub(r'```.*?```', '', cleaned, flags=re.DOTALL)
-        # Wrap the response in proper code block
-        return f"```python\n{cleaned}\n```"
-    return response
+    workspace_future = POOL.submit(get_daytona_client().create, workspace_params)
+    try:
+        yield workspace_future
+    finally:
+        if cancel_requested.is_set():
+            # Drop the queued model calls so they don't start while the workspace is removed
+            POOL.shutdown(wait=False, cancel_futures=True)
+        # A creation still in flight is waited for, so its workspace isn't left behind
+        if not workspace_future.cancel() and workspace_future.exception() is None:
+            print("\n🧹 Cleaning up resources...")
+            print(SEP)
+            print("⏳ Removing Daytona workspace...")
+            cleanup_workspace(workspace_future.result())
+            print("✅ Cleanup completed")
 
 def clean_model_response(response: str) -> str:
     """Clean up the model's response by removing code block markers and other artifacts"""
     try:
-        # First ensure response is in correct format
-        formatted_response = format_model_response(response)
-
-        # Extract code content from properly formatted response
-        code_match = re.search(r'```(?:py|python)?\n(.*?)\n```', formatted_response, re.DOTALL)
+        # Extract code content from a well-formed response in one scan
+        code_match = CODE_BLOCK_RE.search(response)
         if code_match:
             cleaned = code_match.group(1)
         else:
-            # Fallback cleanup if regex fails
-            cleaned = response.strip()
+            # Otherwise drop any malformed code blocks and keep the rest
+            cleaned = ANY_CODE_BLOCK_RE.sub('', response.strip())
 
-        # Remove any remaining code block markers and artifacts
-        cleaned = re.sub(r'```(?:python|py)?', '', cleaned)
-        cleaned = re.sub(r'```\s*$', '', cleaned)
-        cleaned = re.sub(r'<end_code>', '', cleaned)
-        cleaned = re.sub(r'^python\s*$', '', cleaned, flags=re.MULTILINE)  # Remove standalone 'python'
+        # Remove any remaining code block markers and artifacts in one pass
+        cleaned = ARTIFACT_RE.sub('', cleaned)
 
         # Ensure proper line endings
         cleaned = cleaned.replace('\r\n', '\n')
@@ -129,13 +206,22 @@ def clean_model_response(response: str) -> str:
         logging.error(f"Error cleaning model response: {e}")
         return response
 
-def write_test_file(test_file_path: Path, response: str) -> None:
-    """Write the cleaned test code to file"""
+def write_text_atomic(path: Path, text: str) -> None:
+    """Write to a sibling .tmp file and move it into place, so an interrupted write never leaves a partial file"""
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    tmp_path.write_text(text, encoding='utf-8')
+    os.replace(tmp_path, path)
+
+def write_test_file(test_file_path: Path, response: str) -> str:
+    """Write the cleaned test code to file and return it"""
     try:
         cleaned_response = clean_model_response(response)
 
         if not cleaned_response:
             raise ValueError("Empty response after cleaning")
+        # Test cases need at least one class or function; fail fast before writing and parsing anything
+        if 'def ' not in cleaned_response and 'class ' not in cleaned_response:
+            raise ValueError("Response holds no test cases")
 
         # Add required imports
         final_code = []
@@ -147,66 +233,147 @@ def write_test_file(test_file_path: Path, response: str) -> None:
         # Join all parts with proper spacing
         complete_code = '\n'.join(final_code)
 
-        # Validate the final code
-        try:
-            ast.parse(complete_code)
-        except SyntaxError as e:
-            logging.error(f"Invalid Python code generated: {e}")
-            # Try to save anyway but with a warning
-            logging.warning("Saving code despite syntax errors")
-
-        with open(test_file_path, 'w', encoding='utf-8') as test_file:
-            test_file.write(complete_code)
+        # Syntax is checked once, by merge_python_files, before the tests are run
+        write_text_atomic(test_file_path, complete_code)
+        return complete_code
 
     except Exception as e:
         logging.error(f"Failed to write test file: {e}")
         raise
 
-def main():
+def parse_python_code(code: str):
+    """Parse the code once so every check can share the tree. Returns None if it isn't valid Python."""
     try:
-        hf_token = os.getenv('HUGGINGFACE_TOKEN')
-        if not hf_token:
-            raise ValueError("HUGGINGFACE_TOKEN not found in .env file")
+        return ast.parse(code)
+    except SyntaxError:
+        return None
 
-        samples_dir = Path(__file__).parent.parent / 'samples'
-        if not samples_dir.exists():
-            samples_dir.mkdir(exist_ok=True)
-            print(f"Created samples directory at {samples_dir}")
-            print("Please add Python files to analyze in the samples directory and run again.")
-            return
+def remove_standalone_py(code: str) -> str:
+    """
+    Removes standalone 'py' from the code content while leaving 'py' as part of other words like 'pytest'.
+    """
+    # Use regular expression to remove standalone 'py' (not part of other words)
+    return STANDALONE_PY_RE.sub('', code)
 
-        python_files = get_python_files(samples_dir)
-        if not python_files:
-            print("No Python files found in samples directory.")
-            return
+def class_names_in(tree: ast.AST) -> set:
+    """Return the names of all classes defined anywhere in the parsed code."""
+    return {node.name for node in ast.walk(tree) if isinstance(node, ast.ClassDef)}
 
-        selected_file = select_file(python_files)
+def has_duplicate_code(original_code: str, test_code: str, original_tree=None, test_tree=None) -> bool:
+    """
+    Check if the test code contains a duplicate of the original code implementation.
+    The trees are the already parsed code, or None where it didn't parse.
+    """
+    if original_tree is not None and test_tree is not None:
+        # Compare the parsed class definitions, ignoring mentions in strings and comments
+        original_classes = class_names_in(original_tree)
+        test_classes = class_names_in(test_tree)
+        return any(name in test_classes and f"Test{name}" not in test_classes
+                   for name in original_classes)
+
+    # Fall back to text matching when either file doesn't parse, with one scan of the original
+    for class_name in CLASS_NAME_RE.findall(original_code):
+        # If we find the same class name, check if it's a test class
+        if class_name in test_code and f"Test{class_name}" not in test_code:
+            return True
+    return False
+
+def merge_python_files(selected_name, selected_file_content, test_file_content, output_file_path):
+    """
+    Merges the source and test code, avoiding duplicate code.
+    Both are passed in as strings, since the caller already holds them in memory.
+    Returns the merged code that was saved, or None if nothing was merged.
+    """
+    try:
+        # Each file is parsed once, and the tree is shared by the checks below
+        original_tree = parse_python_code(selected_file_content)
+        test_tree = parse_python_code(test_file_content)
 
-        model = HfApiModel(model_id="meta-llama/Llama-3.3-70B-Instruct", token=hf_token)   # Change model here
-        agent = CodeAgent(tools=[], model=model, additional_authorized_imports=["unittest"])
+        # Check for duplicate code
+        if has_duplicate_code(selected_file_content, test_file_content, original_tree, test_tree):
+            print("\n⚠️ Duplicate implementation detected in test file.")
+            print("➡️ Only saving the test file...")
 
-        print(f"\nAnalyzing {selected_file.name}...")
-        print("Press Ctrl+C to cancel the process at any time.")
+            # Extract only the test class and its dependencies
+            cleaned_test_content = test_file_content.replace(selected_file_content, '')
 
-        try:
-            with open(selected_file, 'r') as f:
-                code_content = f.read()
+            # Original implementation first, written in one go
+            merged = (f'# Original implementation from {selected_name}\n'
+                      f'{selected_file_content}\n\n# Test cases\n{cleaned_test_content}')
+            write_text_atomic(output_file_path, merged)
 
-            summary_prompt = f"""
-Analyze this Python code and provide a one-line summary of its main purpose:
+            print(f"✅ Combined file saved to {output_file_path}")
+            return merged
+        else:
+            # No duplicates found, proceed with regular merge
+            if test_tree is not None:
+                merged = f'{selected_file_content}\n\n{test_file_content}'
+                write_text_atomic(output_file_path, merged)
 
-{code_content}
+                print(f"✅ Files merged successfully and saved to {output_file_path}")
+                return merged
+            else:
+                print("❌ Invalid Python code found in test file. Skipping merge.")
 
-Respond with only the summary, no additional text.
-"""
-            summary = agent.run(summary_prompt)
-            print(f"\nCode Summary: {summary}\n")
+    except Exception as e:
+        print(f"❌ Error during file merge: {e}")
+    return None
+
+def format_test_results(execution_response):
+    """Format the test execution results for better readability"""
+    if execution_response.exit_code == 0:
+        output = execution_response.result
+
+        # Format the output, one row per "test_name (...) ... status" line
+        rows = ["\n🧪 Test Execution Results:", SEP]
+        for test_name, status in UNITTEST_LINE_RE.findall(output):
+            result = "✅ PASSED" if status == "ok" else "❌ FAILED"
+            rows.append(f"{test_name:<40} {result}")
+
+        # Add summary from the "Ran N tests in Xs" line
+        summary = UNITTEST_SUMMARY_RE.search(output)
+        time_taken = summary.group(1) if summary else "unknown time"
+
+        rows.append(SEP)
+        rows.append(f"Total Time: {time_taken}")
+        rows.append(f"Final Result: {'✅ All tests passed!' if UNITTEST_OK_RE.search(output) else '❌ Some tests failed!'}")
+
+        return "\n".join(rows) + "\n"
+    else:
+        return f"\n❌ Test execution failed with exit code: {execution_response.exit_code}"
+
+# Model responses are cached here, keyed by the model and the full prompt
+RESPONSE_CACHE_DIR = Path.home() / ".cache" / "smolagents-tester"
+
+def response_cache_path(prompt: str) -> Path:
+    """Return the cache file for a prompt sent to MODEL_ID"""
+    digest = hashlib.sha256(f"{MODEL_ID}\0{prompt}".encode('utf-8')).hexdigest()
+    return RESPONSE_CACHE_DIR / f"{digest}.txt"
+
+def load_cached_response(cache_path: Path):
+    """Return a previously saved model response, or None if there isn't one"""
+    try:
+        return cache_path.read_text(encoding='utf-8')
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable response cache {cache_path}: {e}")
+        return None
 
-            prompt = f"""
-Generate unittest test cases for the following Python code:
+def store_cached_response(cache_path: Path, response: str) -> None:
+    """Save a model response so the same prompt can skip the model call"""
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        write_text_atomic(cache_path, response)
+    except OSError as e:
+        logging.warning(f"Could not write response cache {cache_path}: {e}")
 
-{code_content}
+# The source code is dropped in between these, with no template to parse on each call
+TEST_PROMPT_PREFIX = """
+Analyze the following Python code, then generate unittest test cases for it:
 
+"""
+TEST_PROMPT_RULES = """
 Ensure:
 - Do NOT execute or run any test cases, only generate the test cases.
 - Do not use any other dependencies than unittest.
@@ -217,237 +384,203 @@ Ensure:
 - Only give the python test cases, nothing else. Never use codeblock or any indication of code end (<end_code>).
 - Make sure that the output is clearly readable and well formatted.
 """
+TEST_PROMPT_SUFFIX = """
 
-            # Generate test cases
-            print("Generating test cases... (This might take a few minutes)")
-            show_spinner.done = False
-            spinner_thread = threading.Thread(target=show_spinner)
-            spinner_thread.start()
-
-            try:
-                response = agent.run(prompt)
-                show_spinner.done = True
-                spinner_thread.join()
-
-                test_file_path = selected_file.parent.parent / f"test_{selected_file.stem}.py"
-                try:
-                    write_test_file(test_file_path, response)
-                    print(f"✅ Test cases generated and saved to {test_file_path}")
-                except ValueError as ve:
-                    print(f"❌ Error generating valid test code: {ve}")
-                except Exception as e:
-                    print(f"❌ Error writing test file: {e}")
-
-            except KeyboardInterrupt:
-                show_spinner.done = True
-                spinner_thread.join()
-                print("\n\n⚠️ Process cancelled by user.")
-                return
-            except Exception as e:
-                show_spinner.done = True
-                spinner_thread.join()
-                print(f"\n❌ Error during code analysis: {str(e)}")
-                return
-
-        except KeyboardInterrupt:
-            print("\n\n⚠️ Process cancelled by user.")
-            return
-        except Exception as e:
-            print(f"\n❌ Error during code analysis: {str(e)}")
-            return
+Respond in exactly this format, with nothing before or after it:
+<<<SUMMARY>>>
+A one-line summary of the code's main purpose.
+<<<TESTS>>>
+The python test cases.
+""" + TEST_PROMPT_RULES
 
-        def is_valid_python_code(code: str) -> bool:
-            try:
-                # Try to parse the code into an AST. If it raises an exception, it's invalid Python.
-                ast.parse(code)
-                return True
-            except SyntaxError:
-                return False
-        def remove_standalone_py(code: str) -> str:
-            """
-            Removes standalone 'py' from the code content while leaving 'py' as part of other words like 'pytest'.
-            """
-            # Use regular expression to remove standalone 'py' (not part of other words)
-            return re.sub(r'(?<!test)\bpy\b(?!test)', '', code)
-            #return re.sub(r'\bpy\b', '', code)
-
-        def has_duplicate_code(original_code: str, test_code: str) -> bool:
-            """
-            Check if the test code contains a duplicate of the original code implementation.
-            """
-            def extract_class_content(code: str, class_name: str) -> str:
-                """Extract class definition and methods for comparison"""
-                pattern = rf"class\s+{class_name}\b[^:]*:.*?(?=\n\S|$)"
-                match = re.search(pattern, code, re.DOTALL)
-                return match.group(0) if match else ""
-
-            # Find all class names in original code
-            class_names = re.findall(r'class\s+(\w+)', original_code)
-
-            for class_name in class_names:
-                original_class = extract_class_content(original_code, class_name)
-                if original_class and class_name in test_code:
-                    # If we find the same class name, check if it's a test class
-                    if not f"Test{class_name}" in test_code:
-                        return True
-            return False
-
-        def merge_python_files(selected_file, test_file_path, output_file_path):
-            """
-            Merges the content of two Python files, avoiding duplicate code.
-            """
-            try:
-                # Read the content of the selected file
-                with open(selected_file, "r") as file1:
-                    selected_file_content = file1.read()
-
-                # Read the content of the test file
-                with open(test_file_path, "r") as file2:
-                    test_file_content = file2.read()
-
-                # Check for duplicate code
-                if has_duplicate_code(selected_file_content, test_file_content):
-                    print("\n⚠️ Duplicate implementation detected in test file.")
-                    print("➡️ Only saving the test file...")
-
-                    # Extract only the test class and its dependencies
-                    cleaned_test_content = test_file_content.replace(selected_file_content, '')
-
-                    with open(output_file_path, "w") as output_file:
-                        # Write original implementation first
-                        output_file.write(f'# Original implementation from {selected_file.name}\n')
-                        output_file.write(selected_file_content)
-                        output_file.write('\n\n# Test cases\n')
-                        output_file.write(cleaned_test_content)
-
-                    print(f"✅ Combined file saved to {output_file_path}")
-                else:
-                    # No duplicates found, proceed with regular merge
-                    if is_valid_python_code(test_file_content):
-                        with open(output_file_path, "w") as output_file:
-                            output_file.write(selected_file_content)
-                            output_file.write('\n\n')
-                            output_file.write(test_file_content)
-
-                        print(f"✅ Files merged successfully and saved to {output_file_path}")
-                    else:
-                        print("❌ Invalid Python code found in test file. Skipping merge.")
-
-            except Exception as e:
-                print(f"❌ Error during file merge: {e}")
-
-        output_file_path = selected_file.parent.parent / f"output_{selected_file.stem}.py"
-        merge_python_files(selected_file, test_file_path, output_file_path)
-
-
-        # Execute test cases in Daytona
-        print("\nExecuting test cases in Daytona...")
+# Separate prompts, only used when a combined response can't be split
+TESTS_ONLY_PROMPT_PREFIX = """
+Generate unittest test cases for the following Python code:
 
-        workspace_params = CreateWorkspaceParams(
-            language="python",
-            target=config.target  # Using the value from the Config class
-        )
+"""
+TESTS_ONLY_PROMPT_SUFFIX = "\n" + TEST_PROMPT_RULES
+SUMMARY_PROMPT_PREFIX = """
+Analyze this Python code and provide a one-line summary of its main purpose:
 
-        def format_test_results(execution_response):
-            """Format the test execution results for better readability"""
-            if execution_response.exit_code == 0:
-                # Split the result string into lines
-                lines = execution_response.result.split('\n')
+"""
+SUMMARY_PROMPT_SUFFIX = """
 
-                # Format the output
-                formatted_output = "\n🧪 Test Execution Results:\n"
-                formatted_output += "═" * 50 + "\n"
+Respond with only the summary, no additional text.
+"""
 
-                # Process each line
-                for line in lines:
-                    if "..." in line:  # This is a test result line
-                        test_name = line.split(' ')[0]
-                        result = "✅ PASSED" if "ok" in line else "❌ FAILED"
-                        formatted_output += f"{test_name:<40} {result}\n"
+def request_tests(model, selected_file):
+    """
+    Read one file and get the model's response for its tests, reusing a cached response when there is one.
+    Runs in a worker thread, so all printing is left to the caller.
+    Returns the source code, the raw response, its cache path and whether it came from the cache.
+    """
+    code_content = selected_file.read_text(encoding='utf-8')
+
+    # One request returns both the summary and the tests, split by the markers in the suffix
+    prompt = TEST_PROMPT_PREFIX + code_content + TEST_PROMPT_SUFFIX
+
+    # Unchanged code with the same prompt and model reuses the saved response
+    cache_path = response_cache_path(prompt)
+    response = load_cached_response(cache_path)
+    if response is not None:
+        return code_content, response, cache_path, True
+
+    # An agent keeps state for the run in progress, so each concurrent request gets its own
+    agent = CodeAgent(tools=[], model=model, additional_authorized_imports=["unittest"])
+    response = str(agent.run(prompt))
+    if not RESPONSE_SECTIONS_RE.search(response):
+        # The model ignored the format, so ask for the tests and the summary separately
+        tests = str(agent.run(TESTS_ONLY_PROMPT_PREFIX + code_content + TESTS_ONLY_PROMPT_SUFFIX))
+        summary = str(agent.run(SUMMARY_PROMPT_PREFIX + code_content + SUMMARY_PROMPT_SUFFIX))
+        response = f"<<<SUMMARY>>>\n{summary}\n<<<TESTS>>>\n{tests}"
+    return code_content, response, cache_path, False
+
+def generate_tests_for_file(selected_file, generation, project_root):
+    """
+    Write the tests from one file's model response and merge them with its source.
+    Returns the merged code, or None if generation failed.
+    """
+    print(f"\nAnalyzing {selected_file.name}...")
 
-                # Add summary
-                summary_line = next((line for line in lines if "Ran" in line), "")
-                time_taken = summary_line.split("in")[1].strip() if summary_line else "unknown time"
+    try:
+        code_content, raw_response, cache_path, from_cache = generation.result()
+        if from_cache:
+            print("Reusing cached test cases for unchanged code")
+
+        response = raw_response
+        sections = RESPONSE_SECTIONS_RE.search(response)
+        if sections:
+            summary, response = sections.group(1).strip(), sections.group(2)
+            print(f"\nCode Summary: {summary}\n")
+        else:
+            print("\n⚠️ Response had no summary section, treating it all as test code")
 
-                formatted_output += "═" * 50 + "\n"
-                formatted_output += f"Total Time: {time_taken}\n"
-                formatted_output += f"Final Result: {'✅ All tests passed!' if 'OK' in execution_response.result else '❌ Some tests failed!'}\n"
+        test_file_path = project_root / f"test_{selected_file.stem}.py"
+        try:
+            test_code = write_test_file(test_file_path, response)
+            print(f"✅ Test cases generated and saved to {test_file_path}")
+        except ValueError as ve:
+            print(f"❌ Error generating valid test code: {ve}")
+            return None
+        except Exception as e:
+            print(f"❌ Error writing test file: {e}")
+            return None
 
-                return formatted_output
-            else:
-                return f"\n❌ Test execution failed with exit code: {execution_response.exit_code}"
+    except Exception as e:
+        print(f"\n❌ Error during code analysis: {str(e)}")
+        return None
 
-        try:
-            print("\n🚀 Setting up Daytona workspace...")
-            print("═" * 50)
+    # The merged file is kept on disk for inspection, but the code to run stays in memory
+    output_file_path = project_root / f"output_{selected_file.stem}.py"
+    merged_code = merge_python_files(selected_file.name, code_content, test_code, output_file_path)
 
-            # Create workspace with progress indicator
-            print("⏳ Creating workspace...")
-            workspace = daytona_client.create(workspace_params)
-            print(f"✅ Workspace created successfully (ID: {workspace.id})")
+    # Only new responses whose tests parsed and merged are worth saving
+    if merged_code and not from_cache:
+        store_cached_response(cache_path, raw_response)
+    return merged_code
 
-            print("\n📝 Preparing test environment...")
-            print("═" * 50)
+def main():
+    args = parse_args()
+    try:
+        if not config.hf_token:
+            raise ValueError("HUGGINGFACE_TOKEN not found in .env file")
 
-            # Read test files
-            print("⏳ Loading test files...")
-            selected_file_content = ""
-            test_file_content = ""
+        # Samples live under the project root, and generated files are written next to them
+        project_root = Path(__file__).parent.parent
+        samples_dir = project_root / 'samples'
+        if not samples_dir.exists():
+            samples_dir.mkdir(exist_ok=True)
+            print(f"Created samples directory at {samples_dir}")
+            print("Please add Python files to analyze in the samples directory and run again.")
+            return
 
-            with open(selected_file, 'r') as src_file:
-                selected_file_content = src_file.read()
-            with open(output_file_path, 'r') as test_file:
-                test_file_content = test_file.read()
-            print("✅ Files loaded successfully")
+        if args.file:
+            selected_files = resolve_files(args.file, samples_dir)
+        else:
+            python_files = get_python_files(samples_dir)
+            if not python_files:
+                print("No Python files found in samples directory.")
+                return
 
-            # Send files to Daytona workspace
-            print("⏳ Sending files to workspace...")
+            # Only prompt when the files weren't given on the command line
+            selected_files = python_files if args.all else select_files(python_files)
 
-            # Send source file
-            source_path = f"/workspace/{selected_file.name}"
-            workspace.process.write_file(source_path, selected_file_content)
+        model = HfApiModel(model_id=MODEL_ID, token=config.hf_token)
 
-            # Send test file
-            test_path = f"/workspace/test_{selected_file.stem}.py"
-            workspace.process.write_file(test_path, test_file_content)
+        workspace_params = CreateWorkspaceParams(
+            language="python",
+            target=config.target  # Using the value from the Config class
+        )
 
-            print("✅ Files transferred to workspace")
+        print("Press Ctrl+C to cancel the process at any time.")
 
-            # Execute test code with progress messaging
-            print("\n🧪 Executing tests in Daytona workspace...")
-            print("═" * 50)
-            print("⏳ Running test suite...")
+        # The workspace doesn't depend on the tests, so it's created while they are generated.
+        # It is removed when the with block exits.
+        print("\n🚀 Setting up Daytona workspace in the background...")
+        with daytona_workspace(workspace_params) as workspace_future:
+            # The model calls for different files are independent, so they all run at once
+            print(f"\nGenerating test cases for {len(selected_files)} file(s)... (This might take a few minutes)")
+            # The spinner is submitted first so it has a worker while the model calls queue
+            spinner_stop.clear()
+            spinner = POOL.submit(show_spinner)
+            generations = [POOL.submit(request_tests, model, selected_file) for selected_file in selected_files]
+            try:
+                wait(generations)
+            finally:
+                spinner_stop.set()
+                spinner.result()
+
+            # Write every file's tests first, then run them all in one workspace
+            test_runs = []
+            for selected_file, generation in zip(selected_files, generations):
+                merged_code = generate_tests_for_file(selected_file, generation, project_root)
+                if merged_code:
+                    test_runs.append((selected_file, merged_code))
+
+            if not test_runs:
+                print("\n❌ No test files were generated.")
+                return
 
-            # Execute the test file specifically
-            execution_response = workspace.process.code_run(f"python {test_path}")
+            # Execute test cases in Daytona
+            print("\nExecuting test cases in Daytona...")
 
-            # Format and display results with clear separation
-            print("\n📊 Test Results")
-            print("═" * 50)
-            formatted_results = format_test_results(execution_response)
-            print(formatted_results)
+            try:
+                print(SEP)
+                print("⏳ Waiting for workspace...")
+                workspace = workspace_future.result()
+                print(f"✅ Workspace created successfully (ID: {workspace.id})")
+
+                for selected_file, merged_code in test_runs:
+                    try:
+                        # The merged code already holds the source and its tests
+                        print(f"\n🧪 Executing tests for {selected_file.name} in Daytona workspace...")
+                        print(SEP)
+                        print("⏳ Running test suite...")
+
+                        # Run the test code directly in the workspace interpreter
+                        execution_response = workspace.process.code_run(merged_code)
+
+                        # Format and display results with clear separation
+                        print(f"\n📊 Test Results for {selected_file.name}")
+                        print(SEP)
+                        formatted_results = format_test_results(execution_response)
+                        print(formatted_results)
+
+                    except Exception as e:
+                        # Keep going so one broken file doesn't skip the rest of the batch
+                        print(f"\n❌ Error during test execution for {selected_file.name}:")
+                        print(SEP)
+                        print(f"Error details: {str(e)}")
 
-        except Exception as e:
-            print("\n❌ Error during test execution:")
-            print("═" * 50)
-            print(f"Error details: {str(e)}")
-        finally:
-            # Cleanup workspace with status message
-            if 'workspace' in locals():
-                print("\n🧹 Cleaning up resources...")
-                print("═" * 50)
-                print("⏳ Removing Daytona workspace...")
-                cleanup_workspace(workspace)
-                print("✅ Cleanup completed")
+            except Exception as e:
+                print("\n❌ Error during test execution:")
+                print(SEP)
+                print(f"Error details: {str(e)}")
 
     except KeyboardInterrupt:
         print("\n\n⚠️ Process cancelled by user.")
     except Exception as e:
         print(f"\n❌ An error occurred: {str(e)}")
-    finally:
-        # Cleanup workspace if it exists
-        if 'workspace' in locals():
-            cleanup_workspace(workspace)
 
 if __name__ == "__main__":
     try:
@@ -456,4 +589,10 @@ if __name__ == "__main__":
         print("\n\n⚠️ Process cancelled by user. Exiting...")
     except Exception as e:
         print(f"\n❌ An unexpected error occurred: {str(e)}")
+    finally:
+        if cancel_requested.is_set():
+            # The workspace has been cleaned up by now. Model calls still in flight are
+            # abandoned, since a normal exit would join their threads and wait minutes.
+            sys.stdout.flush()
+            os._exit(0)
     sys.exit(0)